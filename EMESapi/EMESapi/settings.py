@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -52,16 +53,17 @@ INSTALLED_APPS = [
 CORS_ORIGIN_ALLOW_ALL = True
 
 MIDDLEWARE = [
+    'utils.middleware.RequestMetricsMiddleware',
+    'utils.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    "corsheaders.middleware.CorsMiddleware",
-    "django.middleware.common.CommonMiddleware",
 ]
 
 ROOT_URLCONF = 'EMESapi.urls'
@@ -98,6 +100,21 @@ database_url = os.environ.get("DATABASE_URL")
 
 DATABASES['default'] = dj_database_url.parse(database_url)
 
+# Cache
+# Versioned response caching relies on a cache shared by all workers in production
+# (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get("CACHE_LOCATION", ''),
+    }
+}
+
+# Entries are invalidated by version bumps, this timeout only bounds how long
+# superseded entries linger before the backend reclaims them.
+VERSIONED_CACHE_TIMEOUT = int(os.environ.get("VERSIONED_CACHE_TIMEOUT", 24 * 60 * 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -116,10 +133,24 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PBKDF2 runs in the bounded hashing pool of utils.hashing; the other hashers only verify legacy hashes.
+PASSWORD_HASHERS = [
+    'utils.hashing.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'utils.tokens.StatelessJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ),
 
@@ -128,6 +159,37 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Public user directory (/api/users/) keyset pagination
+DIRECTORY_PAGE_SIZE = int(os.environ.get("DIRECTORY_PAGE_SIZE", 50))
+DIRECTORY_MAX_PAGE_SIZE = int(os.environ.get("DIRECTORY_MAX_PAGE_SIZE", 200))
+
+# Membership fee receipt review queue (/api/admin/receipts/) keyset pagination
+REVIEW_QUEUE_PAGE_SIZE = int(os.environ.get("REVIEW_QUEUE_PAGE_SIZE", 50))
+REVIEW_QUEUE_MAX_PAGE_SIZE = int(os.environ.get("REVIEW_QUEUE_MAX_PAGE_SIZE", 200))
+
+# Full-text member search (/api/search/); results past SEARCH_MAX_RESULTS are not paged
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", 1000))
+
+# Username/organization type-ahead (/api/users/autocomplete/). Each worker holds its own index
+# and replays other workers' changes from the shared cache at most every AUTOCOMPLETE_SYNC_SECONDS.
+AUTOCOMPLETE_MAX_RESULTS = int(os.environ.get("AUTOCOMPLETE_MAX_RESULTS", 20))
+AUTOCOMPLETE_SYNC_SECONDS = float(os.environ.get("AUTOCOMPLETE_SYNC_SECONDS", 1))
+AUTOCOMPLETE_LOG_SECONDS = int(os.environ.get("AUTOCOMPLETE_LOG_SECONDS", 60 * 60))
+
+# Rows fetched per database round trip by the streaming admin user export
+USER_EXPORT_CHUNK_SIZE = int(os.environ.get("USER_EXPORT_CHUNK_SIZE", 2000))
+
+# "opaque" issues rest_framework.authtoken keys on login/register, "jwt" issues
+# stateless access/refresh tokens. Both kinds are accepted in either mode.
+AUTH_TOKEN_MODE = os.environ.get("AUTH_TOKEN_MODE", "opaque").lower()
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get("JWT_ACCESS_TOKEN_MINUTES", 15))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.environ.get("JWT_REFRESH_TOKEN_DAYS", 7))),
+    'UPDATE_LAST_LOGIN': False,
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'EMES API',
     'DESCRIPTION': 'EMES API Documentation',
@@ -164,6 +226,50 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'  # Public URL for serving media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Largest file accepted by the upload endpoints; bigger bodies are rejected before being read
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+
+# manage.py compact_sections keeps unreferenced section rows written within this many hours,
+# since rows created through the router endpoints have no user until one is pointed at them
+COMPACTION_GRACE_HOURS = float(os.environ.get("COMPACTION_GRACE_HOURS", 24))
+
+# Bulk member import: rows per validated, hashed and inserted batch, the largest file the
+# admin endpoint accepts, and the password hashing pool (0 means one worker per CPU)
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_BYTES = int(os.environ.get("IMPORT_MAX_BYTES", 50 * 1024 * 1024))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 0))
+
+# Hashing for login and registration: worker processes per web process (0 means one per CPU)
+# and how many hashes may wait for one before requests are answered with 503
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", 0))
+PASSWORD_HASH_QUEUE_MAX = int(os.environ.get("PASSWORD_HASH_QUEUE_MAX", 32))
+
+# Sliding-window rate limits per route, per client IP and per username, as "<requests>/<second|minute|hour|day>".
+# They are checked before any password hashing or database work; an empty value disables a limit.
+THROTTLE_RATES = {
+    'login': {
+        'ip': os.environ.get("THROTTLE_LOGIN_IP", "60/minute"),
+        'username': os.environ.get("THROTTLE_LOGIN_USERNAME", "10/minute"),
+    },
+    'register': {
+        'ip': os.environ.get("THROTTLE_REGISTER_IP", "20/hour"),
+        'username': os.environ.get("THROTTLE_REGISTER_USERNAME", "5/hour"),
+    },
+    'view_request': {
+        'ip': os.environ.get("THROTTLE_VIEW_REQUEST_IP", "300/hour"),
+        'username': os.environ.get("THROTTLE_VIEW_REQUEST_USERNAME", "100/hour"),
+    },
+}
+
+# Bulk moderation (/api/admin/moderation/): ids accepted per request, across all operations
+MODERATION_MAX_IDS = int(os.environ.get("MODERATION_MAX_IDS", 10000))
+
+# Square WebP variants rendered for every profile picture, in pixels, and the
+# worker pool that renders them off the request thread
+PROFILE_PICTURE_SIZES = (64, 256, 512)
+DERIVATIVE_WORKERS = int(os.environ.get("DERIVATIVE_WORKERS", 2))
+DERIVATIVE_MAX_PENDING = int(os.environ.get("DERIVATIVE_MAX_PENDING", 32))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -177,4 +283,20 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True  
 EMAIL_HOST_USER = 'email@example.com'  
 EMAIL_HOST_PASSWORD = 'password'  
-DEFAULT_FROM_EMAIL = 'webmaster@example.com'  
\ No newline at end of file
+DEFAULT_FROM_EMAIL = 'webmaster@example.com'  
+
+# Email outbox delivered by `manage.py send_outbox`
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", 60))
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", 300))
+
+# Per-request timings: sent to clients in a Server-Timing header and scraped from /metrics,
+# which requires `Authorization: Bearer <METRICS_TOKEN>` or a client address listed in
+# METRICS_ALLOWED_IPS (comma-separated); with neither set it is only served when DEBUG is on
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", "true").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()]
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
@@ -18,12 +18,16 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.static import static
 from django.conf import settings
+from User.derivatives import serve_derivative
+from utils.middleware import metrics_view
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('media/derivatives/<path:path>', serve_derivative, name='serve_derivative'),
     path('api/', include('User.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
     # API schema view
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
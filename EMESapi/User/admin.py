@@ -13,6 +13,12 @@ from .models import (
     AnnualMembershipFee,
     User,
     ViewRequests,
+    OutboundEmail,
+    StoredBlob,
+    DirectoryEntry,
+    ReceiptStatusCount,
+    MemberStatCount,
+    CompactionCheckpoint,
 )
 
 admin.site.register(Address)
@@ -26,3 +32,9 @@ admin.site.register(Award)
 admin.site.register(AnnualMembershipFee)
 admin.site.register(User)
 admin.site.register(ViewRequests)
+admin.site.register(OutboundEmail)
+admin.site.register(StoredBlob)
+admin.site.register(DirectoryEntry)
+admin.site.register(ReceiptStatusCount)
+admin.site.register(MemberStatCount)
+admin.site.register(CompactionCheckpoint)
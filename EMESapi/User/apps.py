@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'User'
+
+    def ready(self):
+        from utils.throttling import validate_rates
+        from . import signals  # noqa: F401
+        from .search import create_search_index
+
+        validate_rates()
+
+        post_migrate.connect(create_search_index, sender=self)
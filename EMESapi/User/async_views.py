@@ -0,0 +1,206 @@
+"""
+Async versions of the read-heavy endpoints and of login for ASGI deployments.
+
+These are plain Django async views, since DRF views are sync only. They run on
+the event loop and talk to the database through the async ORM, and they return
+the same payloads as their counterparts in ``views.py``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from utils.hashing import HashingUnavailable, acheck_password, amake_password
+from utils.pagination import DirectoryCursorPagination
+from utils.throttling import check_rates, request_idents
+from utils.tokens import aauthenticate, issue_tokens
+from .directory import directory_rows
+from .models import DirectoryEntry, User, ViewRequests
+from .serializer import UserProfileBundleSerializer, UserSerializer
+from .views import directory_entry
+
+
+def _error(exception):
+    response = JsonResponse({"detail": str(exception.detail)}, status=exception.status_code)
+    if getattr(exception, 'wait', None):
+        response['Retry-After'] = str(exception.wait)
+    return response
+
+
+def _throttled(wait):
+    response = JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+async def _authenticated_user(request):
+    """Returns ``(user, None)`` or ``(None, error_response)``."""
+    try:
+        user = await aauthenticate(request)
+    except APIException as exception:
+        return None, _error(exception)
+    if user is None:
+        return None, JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    return user, None
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"detail": "Expected a JSON object."}, status=400)
+    username = data.get('username')
+    password = data.get('password')
+
+    wait = await sync_to_async(check_rates)('login', request_idents(request, username))
+    if wait is not None:
+        return _throttled(wait)
+
+    user = None
+    if isinstance(username, str) and isinstance(password, str):
+        user = await User.objects.prefetch_related('groups', 'user_permissions').filter(username=username).afirst()
+    try:
+        # Unknown users are checked against no hash, which costs the same as a real check.
+        is_correct, must_update = await acheck_password(password, user.password if user else None)
+        if is_correct and must_update:
+            user.password = await amake_password(password)
+            await user.asave(update_fields=['password'])
+    except HashingUnavailable as exception:
+        return _error(exception)
+
+    if not is_correct or not user.is_active:
+        return JsonResponse({"message": "login failed"}, status=400)
+
+    # Records last_login, like the sync login view.
+    await user_logged_in.asend(sender=user.__class__, request=request, user=user)
+
+    if settings.AUTH_TOKEN_MODE == 'jwt':
+        credentials = issue_tokens(user)
+    else:
+        token, _ = await Token.objects.aget_or_create(user=user)
+        credentials = {"token": token.key}
+    return JsonResponse({
+        **credentials,
+        "user": UserSerializer(user).data,
+        "message": "login successful",
+    })
+
+
+@require_GET
+async def get_users(request, user_id=None):
+    organization_filter = request.GET.get('organization', None)
+
+    if user_id:
+        user = await directory_rows(DirectoryEntry.objects.filter(user_id=user_id)).afirst()
+        if user is None:
+            return JsonResponse({"detail": "No User matches the given query."}, status=404)
+        return JsonResponse(directory_entry(user))
+
+    users = DirectoryEntry.objects.all()
+
+    if organization_filter:
+        if organization_filter.lower() == 'true':
+            users = users.filter(is_organization=True)
+        elif organization_filter.lower() == 'false':
+            users = users.filter(is_organization=False)
+        else:
+            return JsonResponse({"detail": "Invalid 'organization' filter. Use 'true' or 'false'."}, status=400)
+
+    paginator = DirectoryCursorPagination()
+    try:
+        page = await paginator.apaginate_queryset(directory_rows(users), Request(request))
+    except APIException as exception:
+        return _error(exception)
+
+    return JsonResponse({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': [directory_entry(user) for user in page],
+    })
+
+
+@require_GET
+async def fetch_users(request, user_id=None):
+    user, error = await _authenticated_user(request)
+    if error:
+        return error
+    if not user.is_staff:
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+    if user_id:
+        try:
+            user = await User.objects.with_profile().aget(id=user_id)
+        except User.DoesNotExist:
+            return JsonResponse({"detail": "No User matches the given query."}, status=404)
+        return JsonResponse(UserProfileBundleSerializer(user).data)
+
+    status_filter = request.GET.get('status', None)
+    if status_filter == "verified":
+        users = User.objects.filter(verified=True)
+    elif status_filter == "unverified":
+        users = User.objects.filter(verified=False)
+    elif status_filter:
+        return JsonResponse({"message": "Invalid status filter. Use 'verified' or 'unverified'."}, status=400)
+    else:
+        users = User.objects.all()
+
+    serializer = UserSerializer()
+    users_data = [
+        serializer.to_representation(user)
+        async for user in users.prefetch_related('groups', 'user_permissions')
+    ]
+    return JsonResponse(users_data, safe=False)
+
+
+def _create_view_request(issuer, requested_user):
+    # atomic() has no async form; the savepoint keeps a duplicate from breaking an outer transaction.
+    with transaction.atomic():
+        ViewRequests.objects.create(issuer=issuer, requested_user=requested_user)
+
+
+@csrf_exempt
+@require_POST
+async def create_view_request(request, user_id):
+    requesting_user, error = await _authenticated_user(request)
+    if error:
+        return error
+
+    wait = await sync_to_async(check_rates)('view_request', request_idents(request, requesting_user.username))
+    if wait is not None:
+        return _throttled(wait)
+
+    if not requesting_user.verified:
+        return JsonResponse(
+            {"message": "You must be a verified user to request full information."}, status=400
+        )
+
+    try:
+        user_to_view = await User.objects.only('id', 'username').aget(id=user_id)
+    except User.DoesNotExist:
+        return JsonResponse({"detail": "No User matches the given query."}, status=404)
+
+    # The unique (issuer, requested_user) constraint rejects duplicates, including concurrent ones.
+    try:
+        await sync_to_async(_create_view_request)(requesting_user, user_to_view)
+    except IntegrityError:
+        return JsonResponse(
+            {"message": "You have already made a request to view this user's full information."}, status=400
+        )
+
+    return JsonResponse(
+        {"message": f"Request to view {user_to_view.username}'s full information has been sent."}, status=201
+    )
@@ -0,0 +1,172 @@
+"""
+In-memory prefix index over the usernames and organization names of verified
+non-staff members, for type-ahead lookups that never touch the database.
+
+Every process keeps its own sorted key array and answers a prefix with one
+binary search and a scan over the matching run. Saves and deletes are applied locally by the ``User`` signals
+and appended to a sequenced change log in the shared cache; other processes
+replay the log at most every ``AUTOCOMPLETE_SYNC_SECONDS`` and rebuild from the
+database only if they fell behind its retention.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+
+
+SEQUENCE_KEY = 'autocomplete:sequence'
+
+# Changes replayed one by one before a full rebuild becomes the cheaper option
+MAX_REPLAY = 1000
+
+# User columns that decide a member's keys or whether they are indexed at all
+AUTOCOMPLETE_FIELDS = {'username', 'first_name', 'last_name', 'is_organization', 'verified', 'is_staff'}
+
+_COLUMNS = ('id', 'username', 'first_name', 'last_name', 'is_organization')
+
+
+def _change_key(sequence):
+    return f"autocomplete:change:{sequence}"
+
+
+def _keys(username, name, is_organization):
+    keys = {username.casefold()}
+    if is_organization and name:
+        # Every word of an organization name starts a key, so "air" finds "Ethiopian Airlines".
+        words = name.casefold().split()
+        keys.update(' '.join(words[position:]) for position in range(len(words)))
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._ids = array('q')
+        self._entries = {}  # user id -> (username, name, is_organization, keys)
+        self._built = False
+        self._sequence = 0
+        self._synced_at = 0.0
+
+    def _insert(self, user_id, username, first_name, last_name, is_organization):
+        name = f"{first_name} {last_name}".strip()
+        keys = _keys(username, name, is_organization)
+        self._entries[user_id] = (username, name, is_organization, keys)
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, user_id)
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for key in entry[3]:
+            position = bisect_left(self._keys, key)
+            while self._ids[position] != user_id:
+                position += 1
+            del self._keys[position]
+            del self._ids[position]
+
+    def _build(self):
+        self._sequence = cache.get(SEQUENCE_KEY, 0)
+        entries, pairs = {}, []
+        rows = User.objects.filter(verified=True, is_staff=False).values_list(*_COLUMNS).iterator(chunk_size=10000)
+        for user_id, username, first_name, last_name, is_organization in rows:
+            name = f"{first_name} {last_name}".strip()
+            keys = _keys(username, name, is_organization)
+            entries[user_id] = (username, name, is_organization, keys)
+            pairs.extend((key, user_id) for key in keys)
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._ids = array('q', (user_id for _, user_id in pairs))
+        self._entries = entries
+        self._built = True
+        self._synced_at = time.monotonic()
+
+    def _reload(self, user_ids):
+        rows = User.objects.filter(id__in=user_ids, verified=True, is_staff=False).values_list(*_COLUMNS)
+        for user_id in user_ids:
+            self._remove(user_id)
+        for row in rows:
+            self._insert(*row)
+
+    def _sync(self):
+        self._synced_at = time.monotonic()
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if sequence == self._sequence:
+            return
+        if not self._sequence < sequence <= self._sequence + MAX_REPLAY:
+            # The log was reset, or replaying it would cost more than a rebuild.
+            self._build()
+            return
+        wanted = [_change_key(number) for number in range(self._sequence + 1, sequence + 1)]
+        changes = cache.get_many(wanted)
+        if len(changes) != len(wanted):
+            # Entries expired before this process saw them.
+            self._build()
+            return
+        self._reload(set(changes.values()))
+        self._sequence = sequence
+
+    def lookup(self, prefix, limit):
+        """
+        Returns up to ``limit`` members whose username or organization name starts with ``prefix``.
+        """
+        prefix = prefix.casefold()
+        with self._lock:
+            if not self._built:
+                self._build()
+            elif time.monotonic() - self._synced_at >= settings.AUTOCOMPLETE_SYNC_SECONDS:
+                self._sync()
+
+            results, seen = [], set()
+            position = bisect_left(self._keys, prefix)
+            while position < len(self._keys) and len(results) < limit and self._keys[position].startswith(prefix):
+                user_id = self._ids[position]
+                position += 1
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                username, name, is_organization, _ = self._entries[user_id]
+                results.append({
+                    'id': user_id,
+                    'username': username,
+                    'name': name,
+                    'is_organization': is_organization,
+                })
+            return results
+
+    def refresh(self, user_ids):
+        """Applies committed changes to ``user_ids`` in this process and logs them for the others."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        try:
+            last = cache.incr(SEQUENCE_KEY, len(user_ids))
+        except ValueError:
+            cache.add(SEQUENCE_KEY, 0, timeout=None)
+            last = cache.incr(SEQUENCE_KEY, len(user_ids))
+        if len(user_ids) <= MAX_REPLAY:
+            first = last - len(user_ids) + 1
+            cache.set_many(
+                {_change_key(first + offset): user_id for offset, user_id in enumerate(user_ids)},
+                timeout=settings.AUTOCOMPLETE_LOG_SECONDS,
+            )
+        # Larger batches leave a gap in the log, which makes every process rebuild.
+
+        with self._lock:
+            if not self._built:
+                return
+            if len(user_ids) > MAX_REPLAY:
+                self._built = False
+            else:
+                self._reload(set(user_ids))
+
+
+prefix_index = PrefixIndex()
@@ -0,0 +1,143 @@
+"""
+Garbage collection of profile section rows that no user references any more.
+
+Replacing a section (``add_*``, ``upload_degree``, ``upload_receipt``) repoints
+the user's foreign key and leaves the previous row behind. The collector walks
+each section table in primary key windows, deletes the unreferenced rows of a
+window in one short transaction, and releases the uploaded files they point
+at. The last finished window of every table is checkpointed in the database,
+so an interrupted run resumes where it stopped. Rows written within the grace
+period are left alone, since sections created through the router endpoints
+have no user until one is pointed at them.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from utils.cache import bump_version
+from .models import PROFILE_SECTIONS, AnnualMembershipFee, CompactionCheckpoint, Education, StoredBlob, User
+from .receipts import adjust_receipt_counts
+from .uploads import release_blob
+
+# Section columns holding the URL of an uploaded file
+SECTION_FILE_FIELDS = {Education: 'degree_file', AnnualMembershipFee: 'receipt'}
+
+
+def _checkpoint_table(model):
+    return model._meta.label_lower
+
+
+def section_models():
+    """Returns ``(model, user foreign key name)`` for every profile section."""
+    return [(User._meta.get_field(field).related_model, field) for field in PROFILE_SECTIONS]
+
+
+class CompactionReport:
+    def __init__(self):
+        self.rows = Counter()
+        self.bytes = 0
+
+    def as_dict(self):
+        return {"rows": dict(self.rows), "total_rows": sum(self.rows.values()), "bytes": self.bytes}
+
+
+def _orphans(model, field, low, high, cutoff):
+    referenced = User.objects.filter(**{field: OuterRef('pk')})
+    return model.objects.filter(pk__gt=low, pk__lte=high, updated_at__lt=cutoff).filter(~Exists(referenced))
+
+
+def _delete_window(model, field, low, high, cutoff):
+    file_field = SECTION_FILE_FIELDS.get(model)
+    columns = ['id', file_field] if file_field else ['id']
+    counted = model is AnnualMembershipFee
+    if counted:
+        columns.append('status')
+    with transaction.atomic():
+        # Locking the orphans makes a concurrent foreign key assignment wait for this delete.
+        rows = list(_orphans(model, field, low, high, cutoff).select_for_update().values_list(*columns))
+        if not rows:
+            return 0, 0
+        ids = [row[0] for row in rows]
+        # Raw DELETE: the rows are unreferenced, so the per-row deletion signals have
+        # nothing to do beyond the receipt totals, which are adjusted here.
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        if counted:
+            adjust_receipt_counts({status: -count for status, count in Counter(row[-1] for row in rows).items()})
+        freed = sum(release_blob(row[1]) for row in rows if file_field and row[1])
+    bump_version(model)
+    return len(ids), freed
+
+
+def _estimate_window(model, field, low, high, cutoff, releases):
+    file_field = SECTION_FILE_FIELDS.get(model)
+    if not file_field:
+        return _orphans(model, field, low, high, cutoff).count()
+    rows = list(_orphans(model, field, low, high, cutoff).values_list(file_field, flat=True))
+    releases.update(path for path in rows if path)
+    return len(rows)
+
+
+def _estimate_bytes(releases):
+    # A blob is freed once every reference to it is released.
+    paths = {path[len(settings.MEDIA_URL):] if path.startswith(settings.MEDIA_URL) else path: count
+             for path, count in releases.items()}
+    return sum(
+        size for path, size, ref_count in StoredBlob.objects.filter(path__in=list(paths)).values_list('path', 'size', 'ref_count')
+        if ref_count <= paths[path]
+    )
+
+
+def compact_sections(batch_size=1000, dry_run=False, restart=False, pause=0.0, grace=None, progress=None):
+    """
+    Deletes unreferenced profile section rows and the files behind them.
+
+    :param batch_size: Width of each primary key window; one transaction per window.
+    :param dry_run: Only count what would be reclaimed, without deleting or checkpointing.
+    :param restart: Ignore stored checkpoints and start every table from the beginning.
+    :param pause: Seconds to sleep between windows, to leave room for regular traffic.
+    :param grace: timedelta; rows written more recently are kept. Defaults to ``COMPACTION_GRACE_HOURS``.
+    :param progress: Optional callable receiving ``(model, last primary key, report)``.
+    :return: A CompactionReport.
+    """
+    report = CompactionReport()
+    releases = Counter()
+    if grace is None:
+        grace = timedelta(hours=settings.COMPACTION_GRACE_HOURS)
+    cutoff = timezone.now() - grace
+
+    for model, field in section_models():
+        checkpoint = CompactionCheckpoint.objects.filter(table=_checkpoint_table(model))
+        low = 0 if restart or dry_run else checkpoint.values_list('last_id', flat=True).first() or 0
+        last = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        while low < last:
+            high = low + batch_size
+            if dry_run:
+                report.rows[model.__name__] += _estimate_window(model, field, low, high, cutoff, releases)
+            else:
+                rows, freed = _delete_window(model, field, low, high, cutoff)
+                report.rows[model.__name__] += rows
+                report.bytes += freed
+                CompactionCheckpoint.objects.update_or_create(
+                    table=_checkpoint_table(model), defaults={'last_id': high},
+                )
+            low = high
+            if progress:
+                progress(model, min(high, last), report)
+            if pause:
+                time.sleep(pause)
+
+        if not dry_run:
+            # A finished table is scanned from the start again next time.
+            checkpoint.delete()
+
+    if dry_run:
+        report.bytes = _estimate_bytes(releases)
+    return report
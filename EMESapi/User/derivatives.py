@@ -0,0 +1,147 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponseRedirect
+from django.views.static import serve
+
+from utils.images import render_square_variants
+from .models import StoredBlob
+
+logger = logging.getLogger(__name__)
+
+# ``<aa>/<bb>/<sha256>_<size>.webp`` below derivatives/, as written by derivative_path()
+_DERIVATIVE_PATH = re.compile(r'(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<hash>[0-9a-f]{64})_(?P<size>[0-9]+)\.webp')
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+def _get_executor():
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.DERIVATIVE_WORKERS)
+            _pending = threading.BoundedSemaphore(settings.DERIVATIVE_MAX_PENDING)
+        return _executor
+
+
+def picture_content_hash(picture_name):
+    # Only content-addressed blobs have derivatives; legacy uploads keep their original only.
+    if not picture_name or not picture_name.startswith('blobs/'):
+        return None
+    return os.path.splitext(os.path.basename(picture_name))[0]
+
+
+def derivative_path(content_hash, size):
+    return f'derivatives/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}_{size}.webp'
+
+
+def derivative_urls(picture_name):
+    """
+    Returns ``{size: url}`` for the pre-sized variants of a profile picture, or None.
+
+    Computed from the picture's content hash alone, so it costs no I/O.
+    """
+    content_hash = picture_content_hash(picture_name)
+    if content_hash is None:
+        return None
+    return {
+        str(size): f'{settings.MEDIA_URL}{derivative_path(content_hash, size)}'
+        for size in settings.PROFILE_PICTURE_SIZES
+    }
+
+
+def _save_variants(content_hash, variants):
+    for size, data in variants.items():
+        path = derivative_path(content_hash, size)
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(data))
+
+
+def _on_rendered(content_hash, future):
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception("Rendering profile picture variants for %s failed", content_hash)
+        return
+    finally:
+        _pending.release()
+    _save_variants(content_hash, variants)
+
+
+def schedule_derivatives(picture_name):
+    """
+    Queues rendering of the variants of ``picture_name`` on the worker pool.
+
+    Returns immediately. When the pool already has ``DERIVATIVE_MAX_PENDING``
+    jobs the picture is skipped, and ``generate_derivatives`` backfills it later.
+
+    :return: True if a job was queued.
+    """
+    content_hash = picture_content_hash(picture_name)
+    if content_hash is None:
+        return False
+    sizes = settings.PROFILE_PICTURE_SIZES
+    if default_storage.exists(derivative_path(content_hash, max(sizes))):
+        return False
+
+    executor = _get_executor()
+    if not _pending.acquire(blocking=False):
+        logger.warning("Profile picture pool saturated, deferring variants for %s", content_hash)
+        return False
+
+    try:
+        with default_storage.open(picture_name) as picture:
+            data = picture.read()
+        future = executor.submit(render_square_variants, data, sizes)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda done: _on_rendered(content_hash, done))
+    return True
+
+
+def generate_derivatives_now(picture_name):
+    """
+    Renders the variants of ``picture_name`` in the calling process; used for backfills.
+    """
+    content_hash = picture_content_hash(picture_name)
+    if content_hash is None:
+        return False
+    with default_storage.open(picture_name) as picture:
+        variants = render_square_variants(picture.read(), settings.PROFILE_PICTURE_SIZES)
+    _save_variants(content_hash, variants)
+    return True
+
+
+def serve_derivative(request, path):
+    """
+    Serves a rendered variant with immutable caching; the content hash in the name
+    guarantees the bytes behind a URL never change.
+    """
+    # Anything else, such as ``../blobs/...``, would let this route serve other media files.
+    match = _DERIVATIVE_PATH.fullmatch(path)
+    if (match is None or match['a'] != match['hash'][:2] or match['b'] != match['hash'][2:4]
+            or int(match['size']) not in settings.PROFILE_PICTURE_SIZES):
+        raise Http404("Not a profile picture variant.")
+
+    try:
+        response = serve(request, f'derivatives/{path}', document_root=settings.MEDIA_ROOT)
+    except Http404:
+        # Not rendered yet: point at the original without letting the redirect be cached.
+        blob = StoredBlob.objects.filter(sha256=match['hash']).only('path').first()
+        if blob is None:
+            raise
+        response = HttpResponseRedirect(f'{settings.MEDIA_URL}{blob.path}')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
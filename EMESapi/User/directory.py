@@ -0,0 +1,84 @@
+"""
+Maintenance of the ``DirectoryEntry`` read model behind the public directory.
+
+The ``User`` signals call ``sync_directory`` after every save that touches
+one of ``DIRECTORY_SOURCE_FIELDS``; bulk writes that bypass signals call it
+themselves, and ``manage.py rebuild_directory`` rebuilds the table from scratch.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from utils.cache import bump_version
+from .models import DirectoryEntry, User
+
+# User columns an entry is built from, or that decide whether the member is listed
+DIRECTORY_SOURCE_FIELDS = {
+    'username', 'first_name', 'last_name', 'nationality', 'sex',
+    'is_organization', 'profile_picture', 'verified', 'is_staff',
+}
+
+# Entry columns copied on every sync
+_ENTRY_FIELDS = ['username', 'full_name', 'nationality', 'sex', 'is_organization', 'profile_picture', 'updated_at']
+
+
+def directory_rows(entries):
+    """``values()`` of ``entries`` in the shape ``views.directory_entry`` expects, ``id`` included."""
+    return entries.values('username', 'full_name', 'nationality', 'sex', 'profile_picture', id=F('user_id'))
+
+
+def _entry(user_id, username, first_name, last_name, nationality, sex, is_organization, profile_picture):
+    return DirectoryEntry(
+        user_id=user_id,
+        username=username,
+        full_name=f"{first_name} {last_name}".strip() or username,
+        nationality=nationality,
+        sex=sex,
+        is_organization=is_organization,
+        profile_picture=profile_picture or None,
+    )
+
+
+def sync_directory(user_ids):
+    """
+    Brings the entries of the given users in line with their ``User`` rows,
+    adding newly listable members and dropping those no longer listed.
+
+    :param user_ids: Iterable of user primary keys.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    rows = User.objects.filter(id__in=user_ids, verified=True, is_staff=False).values_list(
+        'id', 'username', 'first_name', 'last_name', 'nationality', 'sex', 'is_organization', 'profile_picture',
+    )
+    entries = [_entry(*row) for row in rows]
+    with transaction.atomic():
+        DirectoryEntry.objects.filter(user_id__in=user_ids - {entry.user_id for entry in entries}).delete()
+        DirectoryEntry.objects.bulk_create(
+            entries, update_conflicts=True, unique_fields=['user'], update_fields=_ENTRY_FIELDS,
+        )
+
+
+def rebuild_directory(batch_size=2000, progress=None):
+    """
+    Re-syncs every user in id-ordered batches and drops the cached directory pages.
+
+    :param progress: Optional callable receiving the number of users processed so far.
+    :return: Number of users processed.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            bump_version(User, "organization:True", "organization:False")
+            return processed
+        sync_directory(user_ids)
+        bump_version(User, *(f"id:{user_id}" for user_id in user_ids))
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+        if progress:
+            progress(processed)
@@ -0,0 +1,167 @@
+"""
+Bulk member import from NDJSON or CSV.
+
+Rows are processed in batches: each row is validated on its own, usernames are
+checked against the database and the rest of the file once per batch, the
+passwords of the valid rows are hashed across a process pool, and the users
+(and their opaque tokens) are inserted with ``bulk_create`` in one transaction
+per batch. Invalid rows are reported and skipped; they never abort a batch.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+
+from utils.cache import bump_version
+from utils.hashing import hash_passwords
+from .autocomplete import prefix_index
+from .directory import sync_directory
+from .models import User
+from .search import index_users
+from .serializer import MemberImportSerializer
+from .stats import adjust_member_stats, member_facets
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# Errors listed in a report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_rows(stream, import_format):
+    """
+    Yields ``(row number, row)`` pairs from a binary NDJSON or CSV stream.
+
+    Rows that cannot be parsed are yielded as a string describing the problem.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            # Empty cells mean "not given", not "blank".
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, f"Invalid JSON: {error}"
+            continue
+        yield number, row if isinstance(row, dict) else "Each line must be a JSON object."
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, number, username, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "username": username, "errors": errors})
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def _validate(batch, report):
+    validator = MemberImportSerializer()
+    valid = []
+    for number, row in batch:
+        if isinstance(row, str):
+            report.fail(number, None, {"non_field_errors": [row]})
+            continue
+        try:
+            valid.append((number, validator.run_validation(row)))
+        except ValidationError as error:
+            report.fail(number, row.get('username'), error.detail)
+    return valid
+
+
+def _drop_taken_usernames(valid, seen, report):
+    taken = set(
+        User.objects.filter(username__in=[data['username'] for _, data in valid]).values_list('username', flat=True)
+    )
+    kept = []
+    for number, data in valid:
+        username = data['username']
+        if username in taken or username in seen:
+            report.fail(number, username, {"username": ["A user with that username already exists."]})
+            continue
+        seen.add(username)
+        kept.append((number, data))
+    return kept
+
+
+def _insert(rows):
+    users = [User(**data) for _, data in rows]
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        if settings.AUTH_TOKEN_MODE != 'jwt':
+            Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+    return users
+
+
+def _insert_one_by_one(rows, report):
+    # A username taken concurrently failed the whole batch; retry row by row to isolate it.
+    created = []
+    for number, data in rows:
+        try:
+            created.extend(_insert([(number, data)]))
+        except IntegrityError as error:
+            report.fail(number, data['username'], {"non_field_errors": [str(error)]})
+    return created
+
+
+def import_members(rows, batch_size=None, progress=None):
+    """
+    Imports members from ``(row number, row)`` pairs such as those yielded by ``read_rows``.
+
+    :param batch_size: Rows per batch; defaults to ``IMPORT_BATCH_SIZE``.
+    :param progress: Optional callable receiving the report after every batch.
+    :return: An ImportReport.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    report = ImportReport()
+    seen = set()
+    rows = iter(rows)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        valid = _drop_taken_usernames(_validate(batch, report), seen, report)
+        if not valid:
+            continue
+
+        hashes = hash_passwords(data.pop('password', None) or None for _, data in valid)
+        for (_, data), password in zip(valid, hashes):
+            data['password'] = password
+
+        try:
+            users = _insert(valid)
+        except IntegrityError:
+            users = _insert_one_by_one(valid, report)
+        report.created += len(users)
+
+        # bulk_create sends no signals, so update the derived data by hand.
+        created_ids = [user.id for user in users]
+        index_users(created_ids)
+        sync_directory(created_ids)
+        adjust_member_stats(after=member_facets(created_ids).values())
+        prefix_index.refresh(created_ids)
+
+        if progress:
+            progress(report)
+
+    if report.created:
+        bump_version(User, "organization:True", "organization:False")
+    return report
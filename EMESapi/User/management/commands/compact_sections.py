@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from User.compaction import compact_sections
+
+
+class Command(BaseCommand):
+    help = "Deletes profile section rows no user references any more, and their uploaded files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Primary keys per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be reclaimed without deleting.")
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoints of an interrupted run.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument('--grace-hours', type=float, default=None,
+                            help="Keep rows written within this many hours; defaults to COMPACTION_GRACE_HOURS.")
+
+    def handle(self, *args, **options):
+        def progress(model, position, report):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {model.__name__} up to id {position}: {report.rows[model.__name__]} row(s)")
+
+        report = compact_sections(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            restart=options['restart'],
+            pause=options['pause'],
+            grace=None if options['grace_hours'] is None else timedelta(hours=options['grace_hours']),
+            progress=progress,
+        ).as_dict()
+
+        for name, rows in report['rows'].items():
+            if rows:
+                self.stdout.write(f"  {name}: {rows}")
+        verb = "Would reclaim" if options['dry_run'] else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['total_rows']} row(s) and {report['bytes']} byte(s)."
+        ))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from User.derivatives import picture_content_hash, derivative_path, generate_derivatives_now
+from User.models import User
+
+
+class Command(BaseCommand):
+    help = "Renders missing pre-sized profile picture variants."
+
+    def handle(self, *args, **options):
+        largest = max(settings.PROFILE_PICTURE_SIZES)
+        pictures = (
+            User.objects.filter(profile_picture__startswith='blobs/')
+            .values_list('profile_picture', flat=True)
+            .distinct()
+            .iterator()
+        )
+
+        rendered = failed = 0
+        for picture_name in pictures:
+            if default_storage.exists(derivative_path(picture_content_hash(picture_name), largest)):
+                continue
+            try:
+                generate_derivatives_now(picture_name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f"{picture_name}: {error}")
+            else:
+                rendered += 1
+
+        self.stdout.write(f"Rendered variants for {rendered} picture(s), {failed} failed.")
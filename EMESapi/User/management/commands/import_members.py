@@ -0,0 +1,31 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from User.imports import IMPORT_FORMATS, import_members, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports members from an NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import; '.csv' files are read as CSV unless --format is given.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+
+        with open(path, 'rb') as stream:
+            report = import_members(
+                read_rows(stream, import_format),
+                batch_size=options['batch_size'],
+                progress=lambda report: self.stdout.write(f"  {report.created} created, {report.failed} failed"),
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']} ({error['username']}): {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {report.created} member(s), {report.failed} row(s) failed."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from User.directory import rebuild_directory
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the public directory read model from the users table, e.g. after writes that bypass signals."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        processed = rebuild_directory(
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"  {done} user(s) processed"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Synced the directory for {processed} user(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from User.search import rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = "Re-indexes every member for full-text search, e.g. after bulk imports that bypass signals."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search_backend() is None:
+            self.stderr.write("Full-text search is not available on this database.")
+            return
+
+        processed = rebuild_search_index(
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"  {done} member(s) processed"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Indexed {processed} member(s)."))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from User.stats import recompute_member_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the admin member statistics snapshot from grouped counts, correcting any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=3600.0, help="Seconds between recomputes.")
+        parser.add_argument('--once', action='store_true', help="Recompute once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = recompute_member_stats()
+            self.stdout.write(f"Recomputed the statistics of {stats['members']} member(s).")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
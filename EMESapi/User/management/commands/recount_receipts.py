@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from User.receipts import recount_receipts
+
+
+class Command(BaseCommand):
+    help = "Recounts the membership fee receipts per status, e.g. after writes that bypass signals."
+
+    def handle(self, *args, **options):
+        counts = recount_receipts()
+        summary = ", ".join(f"{status}: {count}" for status, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Recounted receipts ({summary})."))
@@ -0,0 +1,32 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import DEFAULT_PASSWORD, SEED_PREFIX, ensure_admin, seed_members
+from User.models import User
+
+
+class Command(BaseCommand):
+    help = "Bulk-creates synthetic members with profile sections and view requests for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help="Number of members to create.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed yields the same data.")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Password shared by every seeded member.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # Continue numbering after earlier runs so usernames never collide.
+        start = User.objects.filter(username__startswith=SEED_PREFIX).exclude(username=f"{SEED_PREFIX}admin").count()
+        created = seed_members(
+            options['users'],
+            rng=random.Random(options['seed'] + start),
+            start=start,
+            password=options['password'],
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"  {done} member(s) created"),
+        )
+        admin = ensure_admin(options['password'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} member(s); log in as '{admin.username}' for the admin routes."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from User.outbox import deliver_due_emails
+
+
+class Command(BaseCommand):
+    help = "Delivers queued outbox emails in batches over a reused connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Emails sent per connection.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the due emails once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_due_emails(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
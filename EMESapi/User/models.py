@@ -1,8 +1,31 @@
+import copy
+
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+
+
+# Base for models whose changes clients revalidate
+class TimestampedModel(models.Model):
+    """
+    Abstract base keeping ``updated_at`` current, the source of the conditional GET validators.
+    """
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # auto_now only applies to the columns being saved, so partial saves must include it.
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 # Address Model
-class Address(models.Model):
+class Address(TimestampedModel):
     residential = models.CharField(max_length=255)
     employer = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
@@ -13,7 +36,7 @@ class Address(models.Model):
 
 
 # Contact Model
-class Contact(models.Model):
+class Contact(TimestampedModel):
     email = models.EmailField()
     phone_number = models.CharField(max_length=20)
 
@@ -22,7 +45,7 @@ class Contact(models.Model):
 
 
 # Education Model
-class Education(models.Model):
+class Education(TimestampedModel):
     highest_degree = models.CharField(max_length=100)
     field_of_study = models.CharField(max_length=100)
     university = models.CharField(max_length=255)
@@ -30,12 +53,18 @@ class Education(models.Model):
     specialization = models.CharField(max_length=100, blank=True, null=True)
     degree_file = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # EducationViewSet.highest_degree
+            models.Index(fields=['graduation_year'], name='education_grad_year_idx'),
+        ]
+
     def __str__(self):
         return f"{self.highest_degree} in {self.field_of_study}"
 
 
 # Professional Experience Model
-class ProfessionalExperience(models.Model):
+class ProfessionalExperience(TimestampedModel):
     organization = models.CharField(max_length=255)
     position = models.CharField(max_length=100)
     key_responsibilities = models.TextField()
@@ -47,28 +76,40 @@ class ProfessionalExperience(models.Model):
 
 
 # Publications Model
-class Publications(models.Model):
+class Publications(TimestampedModel):
     title = models.CharField(max_length=255)
     journal = models.CharField(max_length=255)
     date = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # PublicationsViewSet.by_year, which Django turns into a date range
+            models.Index(fields=['date'], name='publication_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
 # Projects Model
-class Projects(models.Model):
+class Projects(TimestampedModel):
     title = models.CharField(max_length=255)
     description = models.TextField()
     start = models.DateTimeField()
     end = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # ProjectsViewSet.active_projects; only the open-ended rows are indexed
+            models.Index(fields=['id'], condition=models.Q(end__isnull=True), name='project_active_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
 # Patents Model
-class Patents(models.Model):
+class Patents(TimestampedModel):
     title = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateTimeField()
@@ -78,7 +119,7 @@ class Patents(models.Model):
 
 
 # Award Model
-class Award(models.Model):
+class Award(TimestampedModel):
     title = models.CharField(max_length=255)
     awarding_body = models.CharField(max_length=255)
     year = models.CharField(max_length=4)
@@ -88,16 +129,68 @@ class Award(models.Model):
 
 
 # Annual Membership Fee Model
-class AnnualMembershipFee(models.Model):
+class AnnualMembershipFee(TimestampedModel):
+    PENDING = 'Pending'
+    ACCEPTED = 'Accepted'
+    REJECTED = 'Rejected'
+
     receipt = models.CharField(max_length=100)
     status = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The review queue: one status, oldest first, keyset-paginated
+            models.Index(fields=['status', 'created_at', 'id'], name='fee_review_idx'),
+        ]
 
     def __str__(self):
         return self.receipt
 
 
+# Receipts per status, kept current by the fee signals and by bulk writes that bypass them
+class ReceiptStatusCount(models.Model):
+    status = models.CharField(max_length=100, primary_key=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+
+# Members (non-staff users) per value of each statistics facet, kept current by the User and fee signals
+class MemberStatCount(models.Model):
+    facet = models.CharField(max_length=50)
+    value = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_member_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+# Nullable foreign keys on User that together make up a member's full profile
+PROFILE_SECTIONS = (
+    'address', 'contact', 'education', 'professional_experience', 'projects',
+    'awards', 'publications', 'patents', 'payment',
+)
+
+
+class UserQuerySet(models.QuerySet):
+    def with_profile(self):
+        # Joins every profile section so a full profile costs one query instead of ten.
+        return self.select_related(*PROFILE_SECTIONS)
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 # User Model
-class User(AbstractUser):
+class User(TimestampedModel, AbstractUser):
     sex = models.CharField(max_length=20,blank=True, null=True)
     date_of_birth = models.DateTimeField(blank=True, null=True)
     nationality = models.CharField(max_length=100, blank=True, null=True)
@@ -119,17 +212,162 @@ class User(AbstractUser):
     
     verified = models.BooleanField(default=False)
 
+    objects = UserManager()
+
+    # Fields changed_fields() compares; User/signals.py sets them to the fields its save handlers read.
+    tracked_fields = ()
+    _tracked_json = ()
+
+    @classmethod
+    def track_fields(cls, names):
+        cls.tracked_fields = tuple(cls._meta.get_field(name) for name in sorted(names))
+        cls._tracked_json = tuple(field.attname for field in cls.tracked_fields if isinstance(field, models.JSONField))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The row as loaded, keyed by attname. Deferred fields are missing, so they count as changed.
+        stored = instance._stored_values = dict(zip(field_names, values))
+        for attname in cls._tracked_json:
+            if attname in stored:
+                # JSON values are the only ones that can be edited in place.
+                stored[attname] = copy.deepcopy(stored[attname])
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        stored = self.__dict__.setdefault('_stored_values', {})
+        for field in self.tracked_fields:
+            if (update_fields is None or field.name in update_fields) and field.attname in self.__dict__:
+                value = self.__dict__[field.attname]
+                if isinstance(value, FieldFile):
+                    # Compared by name; the file object holds the instance.
+                    value = value.name
+                elif field.attname in self._tracked_json:
+                    value = copy.deepcopy(value)
+                stored[field.attname] = value
+
+    def changed_fields(self, update_fields=None):
+        """
+        Names of the tracked fields a save would write with a value other than the one last loaded or saved.
+
+        :param update_fields: The ``update_fields`` of the save, limiting the fields compared.
+        :return: A set of field names, or None for a new instance, when every field counts as changed.
+        """
+        if self._state.adding or '_stored_values' not in self.__dict__:
+            return None
+        stored = self._stored_values
+        return {
+            field.name for field in self.tracked_fields
+            if (update_fields is None or field.name in update_fields)
+            and (field.attname not in stored or stored[field.attname] != getattr(self, field.attname))
+        }
+
     def __str__(self):
         return self.username
 
 
 
+# Directory Entry Model
+class DirectoryEntry(models.Model):
+    """
+    Narrow read model of the public directory: one row per verified non-staff
+    member, kept in sync with ``User`` by signals (see ``User/directory.py``).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='directory_entry')
+    username = models.CharField(max_length=150)
+    full_name = models.CharField(max_length=301)
+    nationality = models.CharField(max_length=100, blank=True, null=True)
+    sex = models.CharField(max_length=20, blank=True, null=True)
+    is_organization = models.BooleanField(default=False)
+    # Storage name of the profile picture, from which the variant URLs are derived
+    profile_picture = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # get_users pages in id order, optionally split by is_organization. The
+            # included columns let PostgreSQL answer a page from the index alone.
+            models.Index(
+                fields=['user'],
+                include=['username', 'full_name', 'nationality', 'sex', 'profile_picture'],
+                name='directory_entry_idx',
+            ),
+            models.Index(
+                fields=['is_organization', 'user'],
+                include=['username', 'full_name', 'nationality', 'sex', 'profile_picture'],
+                name='directory_entry_org_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.username
+
+
+# Stored Blob Model
+class StoredBlob(models.Model):
+    """
+    One uploaded file stored once under its content hash and shared by every upload of the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.path
+
+
+# Compaction Checkpoint Model
+class CompactionCheckpoint(models.Model):
+    """Last primary key window of a section table finished by an interrupted ``compact_sections`` run."""
+    table = models.CharField(max_length=100, primary_key=True)
+    last_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} up to id {self.last_id}"
+
+
 # View Requests Model
 class ViewRequests(models.Model):
     issuer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='issued_requests')
     requested_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_requests')
-    
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['issuer', 'requested_user'], name='unique_view_request'),
+        ]
 
     def __str__(self):
         return f"{self.issuer} -> {self.requested_user}"
 
+
+# Outbound Email Model
+class OutboundEmail(models.Model):
+    PENDING = 'Pending'
+    SENT = 'Sent'
+    DEAD = 'Dead'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=20, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
@@ -0,0 +1,157 @@
+"""
+Bulk moderation: verifying and promoting users, approving and rejecting view
+requests, and accepting and rejecting membership fee receipts.
+
+Every operation takes a list of ids and is applied with one locking SELECT
+and one set-based UPDATE or DELETE, all operations in a single transaction.
+Since ``QuerySet.update()`` sends no signals, the derived data the ``User``
+and fee signals normally maintain is updated here by hand.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from utils.cache import bump_version
+from utils.emailbody import generate_html_email_body
+from utils.tokens import revoke_user_tokens
+from .autocomplete import prefix_index
+from .directory import sync_directory
+from .models import AnnualMembershipFee, PROFILE_SECTIONS, User, ViewRequests
+from .outbox import enqueue_emails
+from .receipts import adjust_receipt_counts
+from .search import index_users
+from .stats import adjust_member_stats, member_facets, move_fee_status
+
+# Operation -> (model, field, value, outcome when applied, outcome when already set)
+_UPDATES = {
+    'verify_users': (User, 'verified', True, 'verified', 'already_verified'),
+    'promote_users': (User, 'is_staff', True, 'promoted', 'already_admin'),
+    'accept_receipts': (AnnualMembershipFee, 'status', AnnualMembershipFee.ACCEPTED, 'accepted', 'already_accepted'),
+    'reject_receipts': (AnnualMembershipFee, 'status', AnnualMembershipFee.REJECTED, 'rejected', 'already_rejected'),
+}
+
+MODERATION_OPERATIONS = (*_UPDATES, 'approve_requests', 'reject_requests')
+
+# Everything approving a view request reads, in one joined query
+VIEW_REQUEST_RELATED = ('issuer__contact', *(f'requested_user__{section}' for section in PROFILE_SECTIONS))
+
+
+def requested_user_info(requested_user):
+    """The profile details emailed to the issuer of an approved view request."""
+    return {
+        'full_name': requested_user.get_full_name(),
+        'sex': requested_user.sex,
+        'date_of_birth': requested_user.date_of_birth,
+        'nationality': requested_user.nationality,
+        'address': requested_user.address,
+        'contact': requested_user.contact,
+        'education': requested_user.education,
+        'professional_experience': requested_user.professional_experience,
+        'projects': requested_user.projects,
+        'awards': requested_user.awards,
+        'publications': requested_user.publications,
+        'patents': requested_user.patents,
+    }
+
+
+def issuer_email(issuer):
+    return issuer.contact.email if issuer.contact else issuer.email
+
+
+def _update(operation, ids, now):
+    model, field, value, applied, unchanged = _UPDATES[operation]
+    current = dict(model.objects.select_for_update().filter(id__in=ids).values_list('id', field))
+    changed = [pk for pk, old in current.items() if old != value]
+    if changed:
+        facets_before = member_facets(changed) if model is User else {}
+        model.objects.filter(id__in=changed).update(**{field: value, 'updated_at': now})
+        if model is User:
+            # Moved here rather than after all operations, so a fee change in the same call is not counted twice.
+            adjust_member_stats(facets_before.values(), member_facets(changed).values())
+    if model is AnnualMembershipFee and changed:
+        # The update bypasses the fee signals that keep the receipt totals and member statistics.
+        deltas = Counter({value: len(changed)})
+        deltas.subtract(current[pk] for pk in changed)
+        adjust_receipt_counts(deltas)
+        move_fee_status({pk: current[pk] for pk in changed}, value)
+    outcomes = {pk: unchanged for pk in current}
+    outcomes.update({pk: applied for pk in changed})
+    return outcomes, changed
+
+
+def _approve_requests(ids):
+    view_requests = ViewRequests.objects.select_related(*VIEW_REQUEST_RELATED).select_for_update(of=('self',))
+    outcomes, messages, approved = {}, [], []
+    for view_request in view_requests.filter(id__in=ids):
+        approved.append(view_request.id)
+        email = issuer_email(view_request.issuer)
+        if not email:
+            # Approved all the same, as approve_request does; there is just nowhere to send it.
+            outcomes[view_request.id] = 'approved_without_email'
+            continue
+        messages.append({
+            'subject': "Your Requested User Information",
+            'recipients': [email],
+            'html_body': generate_html_email_body(requested_user_info(view_request.requested_user)),
+        })
+        outcomes[view_request.id] = 'approved'
+    if messages:
+        # The emails are queued in the same transaction as the delete.
+        enqueue_emails(messages)
+    if approved:
+        ViewRequests.objects.filter(id__in=approved).delete()
+    return outcomes
+
+
+def _reject_requests(ids):
+    rejected = list(ViewRequests.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True))
+    if rejected:
+        ViewRequests.objects.filter(id__in=rejected).delete()
+    return {pk: 'rejected' for pk in rejected}
+
+
+def _after_user_changes(user_ids):
+    # What the User signals would have done for a save of verified/is_staff.
+    index_users(user_ids)
+    sync_directory(user_ids)
+
+    def on_commit():
+        for user_id in user_ids:
+            revoke_user_tokens(user_id)
+        bump_version(User, "organization:True", "organization:False", *(f"id:{user_id}" for user_id in user_ids))
+        prefix_index.refresh(user_ids)
+
+    transaction.on_commit(on_commit)
+
+
+def moderate(operations):
+    """
+    Applies bulk moderation operations atomically.
+
+    :param operations: ``{operation: [id, ...]}`` with operations from ``MODERATION_OPERATIONS``.
+    :return: ``{operation: {id: outcome}}``; ids that do not exist get ``"not_found"``.
+    """
+    now = timezone.now()
+    results = {}
+    changed_users = set()
+
+    with transaction.atomic():
+        for operation, ids in operations.items():
+            ids = set(ids)
+            if operation in _UPDATES:
+                outcomes, changed = _update(operation, ids, now)
+                if _UPDATES[operation][0] is User:
+                    changed_users.update(changed)
+                elif changed:
+                    transaction.on_commit(lambda: bump_version(AnnualMembershipFee))
+            elif operation == 'approve_requests':
+                outcomes = _approve_requests(ids)
+            else:
+                outcomes = _reject_requests(ids)
+            results[operation] = {pk: outcomes.get(pk, 'not_found') for pk in sorted(ids)}
+
+        if changed_users:
+            _after_user_changes(sorted(changed_users))
+
+    return results
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def _outbound_email(subject, recipients, body='', html_body='', from_email=None):
+    return OutboundEmail(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def enqueue_email(subject, recipients, body='', html_body='', from_email=None):
+    """
+    Stores an email in the outbox; the ``send_outbox`` command delivers it.
+
+    Call inside the caller's transaction so the email is only queued if the
+    surrounding change commits.
+    """
+    email = _outbound_email(subject, recipients, body, html_body, from_email)
+    email.save()
+    return email
+
+
+def enqueue_emails(messages):
+    """
+    Stores many emails in one INSERT; each message is a dict of ``enqueue_email`` arguments.
+    """
+    return OutboundEmail.objects.bulk_create([_outbound_email(**message) for message in messages])
+
+
+def _claim_batch(batch_size):
+    # Claimed rows are pushed past the lease so a concurrent worker skips them,
+    # and reappear on their own if this worker dies before recording a result.
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+    return batch
+
+
+def _to_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.DEAD
+    else:
+        delay = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_due_emails(batch_size=None):
+    """
+    Sends one batch of due outbox emails over a single backend connection.
+
+    :param batch_size: Maximum number of emails to send; defaults to ``OUTBOX_BATCH_SIZE``.
+    :return: Tuple ``(sent, failed)`` with the number of delivered and failed emails.
+    """
+    batch = _claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent = []
+    failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            _record_failure(email, error)
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            try:
+                connection.send_messages([_to_message(email, connection)])
+            except Exception as error:
+                _record_failure(email, error)
+                failed += 1
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+
+    if sent:
+        OutboundEmail.objects.filter(id__in=sent).update(
+            status=OutboundEmail.SENT, sent_at=timezone.now(), last_error=''
+        )
+    return len(sent), failed
@@ -0,0 +1,88 @@
+"""
+The membership fee receipt review queue and its per-status totals.
+
+The queue reads one status at a time, oldest first, from the
+``fee_review_idx`` index, and joins in the paying user in the same query. The
+totals live in ``ReceiptStatusCount``. The fee signals adjust them on every
+create, status change and delete. Bulk writes that bypass the signals call
+``adjust_receipt_counts`` themselves, and ``manage.py recount_receipts``
+rebuilds them from the fee table.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AnnualMembershipFee, ReceiptStatusCount
+
+RECEIPT_STATUSES = (AnnualMembershipFee.PENDING, AnnualMembershipFee.ACCEPTED, AnnualMembershipFee.REJECTED)
+
+
+def adjust_receipt_counts(deltas):
+    """
+    Adds ``{status: delta}`` to the receipt totals.
+
+    :param deltas: Mapping of status to a positive or negative change; zeros are skipped.
+    """
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        ReceiptStatusCount.objects.bulk_create(
+            [ReceiptStatusCount(status=status) for status in deltas], ignore_conflicts=True,
+        )
+        for status, delta in deltas.items():
+            ReceiptStatusCount.objects.filter(status=status).update(count=F('count') + delta)
+
+
+def receipt_counts():
+    """Receipts per status, with every status of ``RECEIPT_STATUSES`` present."""
+    counts = dict.fromkeys(RECEIPT_STATUSES, 0)
+    counts.update(ReceiptStatusCount.objects.values_list('status', 'count'))
+    return counts
+
+
+def recount_receipts():
+    """
+    Rebuilds the totals with one grouped count of the fee table.
+
+    :return: The new ``receipt_counts()``.
+    """
+    with transaction.atomic():
+        totals = AnnualMembershipFee.objects.values_list('status').annotate(count=Count('id')).order_by()
+        ReceiptStatusCount.objects.all().delete()
+        ReceiptStatusCount.objects.bulk_create(
+            [ReceiptStatusCount(status=status, count=count) for status, count in totals]
+        )
+    return receipt_counts()
+
+
+def review_queue(status=AnnualMembershipFee.PENDING):
+    """
+    Receipts with ``status`` and their payers, as ``values()`` rows for ``review_queue_row``.
+    The payer columns are None for receipts no user references any more.
+    """
+    return AnnualMembershipFee.objects.filter(status=status).values(
+        'id', 'receipt', 'status', 'created_at',
+        payer_id=F('user__id'),
+        payer_username=F('user__username'),
+        payer_first_name=F('user__first_name'),
+        payer_last_name=F('user__last_name'),
+        payer_verified=F('user__verified'),
+    )
+
+
+def review_queue_row(row):
+    payer = None
+    if row['payer_id'] is not None:
+        payer = {
+            'id': row['payer_id'],
+            'username': row['payer_username'],
+            'full_name': f"{row['payer_first_name']} {row['payer_last_name']}".strip() or row['payer_username'],
+            'verified': row['payer_verified'],
+        }
+    return {
+        'id': row['id'],
+        'receipt_url': row['receipt'],
+        'status': row['status'],
+        'created_at': row['created_at'],
+        'user': payer,
+    }
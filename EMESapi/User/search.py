@@ -0,0 +1,199 @@
+"""
+Full-text index over members' names and professional records.
+
+Each verified non-staff member has one document: their names, weighted
+highest, followed by their education, experience, publications, projects,
+patents and awards. PostgreSQL stores it as a ``tsvector`` under a GIN index,
+SQLite in an FTS5 table keyed by user id. The index lives outside the
+migrations, so its table is created on ``post_migrate`` and lazily on first use.
+"""
+import re
+
+from django.db import connection
+
+from .models import User
+
+
+SEARCH_TABLE = 'user_search_index'
+
+# Profile sections, and their columns, whose text is indexed
+SEARCH_SECTIONS = {
+    'education': ('highest_degree', 'field_of_study', 'university', 'specialization'),
+    'professional_experience': ('organization', 'position', 'key_responsibilities'),
+    'publications': ('title', 'journal'),
+    'projects': ('title', 'description'),
+    'patents': ('title', 'description'),
+    'awards': ('title', 'awarding_body'),
+}
+
+# User columns that change a member's document or whether they are indexed at all
+SEARCH_USER_FIELDS = {'username', 'first_name', 'last_name', 'verified', 'is_staff', *SEARCH_SECTIONS}
+
+
+class _PostgresBackend:
+    def create(self, cursor):
+        users_table = connection.ops.quote_name(User._meta.db_table)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            f"user_id bigint PRIMARY KEY REFERENCES {users_table} (id) ON DELETE CASCADE, "
+            f"document tsvector NOT NULL)"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)")
+
+    def upsert(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (user_id, document) "
+            f"VALUES (%s, setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')) "
+            f"ON CONFLICT (user_id) DO UPDATE SET document = EXCLUDED.document",
+            documents,
+        )
+
+    def delete(self, cursor, user_ids):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE user_id = ANY(%s)", [list(user_ids)])
+
+    def search(self, cursor, query, limit, offset):
+        cursor.execute(
+            f"SELECT user_id, ts_rank_cd(document, query) AS score "
+            f"FROM {SEARCH_TABLE}, websearch_to_tsquery('english', %s) query "
+            f"WHERE document @@ query ORDER BY score DESC, user_id LIMIT %s OFFSET %s",
+            [query, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+class _SQLiteBackend:
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(names, body, tokenize='porter unicode61')"
+        )
+
+    def upsert(self, cursor, documents):
+        documents = list(documents)
+        self.delete(cursor, [user_id for user_id, _, _ in documents])
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, names, body) VALUES (%s, %s, %s)", documents)
+
+    def delete(self, cursor, user_ids):
+        user_ids = list(user_ids)
+        if user_ids:
+            placeholders = ', '.join(['%s'] * len(user_ids))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", user_ids)
+
+    def search(self, cursor, query, limit, offset):
+        # Quote every word so user input can never be parsed as FTS5 query syntax.
+        terms = ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+        if not terms:
+            return []
+        # bm25() is lower for better matches; names weigh ten times the body.
+        cursor.execute(
+            f"SELECT rowid, -bm25({SEARCH_TABLE}, 10.0, 1.0) AS score FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY score DESC, rowid LIMIT %s OFFSET %s",
+            [terms, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+_BACKENDS = {'postgresql': _PostgresBackend, 'sqlite': _SQLiteBackend}
+_created = False
+
+
+def search_backend():
+    """
+    Returns the search backend for the default database, creating the index table on first use.
+
+    :return: A backend instance, or None if the database has no supported full-text engine.
+    """
+    global _created
+    backend_class = _BACKENDS.get(connection.vendor)
+    if backend_class is None:
+        return None
+    backend = backend_class()
+    if not _created:
+        with connection.cursor() as cursor:
+            backend.create(cursor)
+        _created = True
+    return backend
+
+
+def create_search_index(**kwargs):
+    """``post_migrate`` receiver creating the index table."""
+    search_backend()
+
+
+def _document(user):
+    names = ' '.join(filter(None, (user.username, user.first_name, user.last_name)))
+    body = []
+    for section, columns in SEARCH_SECTIONS.items():
+        row = getattr(user, section)
+        if row is not None:
+            body.extend(str(value) for value in (getattr(row, column) for column in columns) if value)
+    return user.id, names, ' '.join(body)
+
+
+def index_users(user_ids):
+    """
+    Re-indexes the given members, dropping those that are no longer searchable.
+
+    :param user_ids: Iterable of user primary keys.
+    """
+    backend = search_backend()
+    user_ids = set(user_ids)
+    if backend is None or not user_ids:
+        return
+
+    users = (
+        User.objects.filter(id__in=user_ids, verified=True, is_staff=False)
+        .select_related(*SEARCH_SECTIONS)
+        .only('id', 'username', 'first_name', 'last_name', *(
+            f'{section}__{column}' for section, columns in SEARCH_SECTIONS.items() for column in columns
+        ))
+    )
+    documents = [_document(user) for user in users]
+    with connection.cursor() as cursor:
+        removed = user_ids - {user_id for user_id, _, _ in documents}
+        if removed:
+            backend.delete(cursor, removed)
+        if documents:
+            backend.upsert(cursor, documents)
+
+
+def remove_users(user_ids):
+    backend = search_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, user_ids)
+
+
+def search_users(query, limit, offset=0):
+    """
+    Runs a full-text query against the index.
+
+    :return: List of ``(user_id, score)`` pairs, best match first, or None if search is unavailable.
+    """
+    backend = search_backend()
+    if backend is None:
+        return None
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, limit, offset)
+
+
+def rebuild_search_index(batch_size=2000, progress=None):
+    """
+    Indexes every member from scratch in id-ordered batches.
+
+    :param progress: Optional callable receiving the number of members processed so far.
+    :return: Number of members processed.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return processed
+        index_users(user_ids)
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+        if progress:
+            progress(processed)
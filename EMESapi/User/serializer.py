@@ -1,34 +1,42 @@
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
+from utils.metrics import TimedRepresentationMixin
+from .derivatives import derivative_urls
 from .models import (
     User, Address, Contact, Education, ProfessionalExperience,
     Publications, Projects, Patents, Award, AnnualMembershipFee, ViewRequests
 )
+from .receipts import RECEIPT_STATUSES
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = '__all__'
+
+    def get_profile_picture_variants(self, obj):
+        return derivative_urls(obj.profile_picture.name)
         
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = '__all__'
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Contact
         fields = ['id', 'email', 'phone_number']
 
 
-class EducationSerializer(serializers.ModelSerializer):
+class EducationSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Education
         fields = ['id', 'highest_degree', 'field_of_study', 'degree_file']
 
 
-class ProfessionalExperienceSerializer(serializers.ModelSerializer):
+class ProfessionalExperienceSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = ProfessionalExperience
         fields = [
@@ -37,30 +45,30 @@ class ProfessionalExperienceSerializer(serializers.ModelSerializer):
         ]
 
 
-class PublicationsSerializer(serializers.ModelSerializer):
+class PublicationsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Publications
         fields = ['id', 'title', 'journal', 'date']
 
 
-class ProjectsSerializer(serializers.ModelSerializer):
+class ProjectsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Projects
         fields = ['id', 'title', 'description', 'start', 'end']
 
 
-class PatentsSerializer(serializers.ModelSerializer):
+class PatentsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Patents
         fields = ['id', 'title', 'description', 'date']
 
-class AwardSerializer(serializers.ModelSerializer):
+class AwardSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Award
         fields = ['id', 'title', 'awarding_body', 'year']
 
 
-class AnualMembershipFeeSerializer(serializers.ModelSerializer):
+class AnualMembershipFeeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     receipt_url = serializers.SerializerMethodField()
     class Meta:
         model = AnnualMembershipFee
@@ -69,8 +77,62 @@ class AnualMembershipFeeSerializer(serializers.ModelSerializer):
     def get_receipt_url(self, obj):
         return obj.receipt
 
-class ViewRequestsSerializer(serializers.ModelSerializer):
+    def validate_status(self, value):
+        if value not in RECEIPT_STATUSES:
+            raise serializers.ValidationError(f"Use one of: {', '.join(RECEIPT_STATUSES)}.")
+        return value
+
+class ViewRequestsSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = ViewRequests
         fields = ['id', 'issuer', 'requested_user']
 
+
+class UserProfileBundleSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """
+    A user together with every profile section nested inline.
+    Expects instances loaded with ``User.objects.with_profile()``.
+    """
+    address = AddressSerializer(read_only=True)
+    contact = ContactSerializer(read_only=True)
+    education = EducationSerializer(read_only=True)
+    professional_experience = ProfessionalExperienceSerializer(read_only=True)
+    projects = ProjectsSerializer(read_only=True)
+    awards = AwardSerializer(read_only=True)
+    publications = PublicationsSerializer(read_only=True)
+    patents = PatentsSerializer(read_only=True)
+    payment = AnualMembershipFeeSerializer(read_only=True)
+    profile_picture_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        exclude = ['password', 'groups', 'user_permissions']
+
+    def get_profile_picture_variants(self, obj):
+        return derivative_urls(obj.profile_picture.name)
+
+
+class UserExportSerializer(UserSerializer):
+    """``UserSerializer`` for the bulk export, without credentials and permissions."""
+
+    class Meta(UserSerializer.Meta):
+        fields = None
+        exclude = ['password', 'groups', 'user_permissions']
+
+
+class MemberImportSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """
+    Validates one row of a bulk member import.
+
+    Username uniqueness is checked per batch by the importer instead of per row.
+    """
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)
+
+    class Meta:
+        model = User
+        fields = [
+            'username', 'password', 'email', 'first_name', 'last_name', 'sex',
+            'date_of_birth', 'nationality', 'is_organization', 'verified',
+        ]
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
+
@@ -0,0 +1,220 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from utils.cache import bump_version
+from utils.tokens import TOKEN_CLAIMS, revoke_user_tokens
+from .models import (
+    User, Address, Contact, Education, ProfessionalExperience,
+    Publications, Projects, Patents, Award, AnnualMembershipFee,
+)
+from .autocomplete import AUTOCOMPLETE_FIELDS, prefix_index
+from .directory import DIRECTORY_SOURCE_FIELDS, sync_directory
+from .receipts import adjust_receipt_counts
+from .stats import STAT_SOURCE_FIELDS, adjust_member_stats, member_facets, move_fee_status
+from .search import SEARCH_SECTIONS, SEARCH_USER_FIELDS, index_users, remove_users
+
+SECTION_MODELS = (
+    Address, Contact, Education, ProfessionalExperience,
+    Publications, Projects, Patents, Award, AnnualMembershipFee,
+)
+
+
+# Every User field a receiver below compares, remembered on load for changed_fields()
+User.track_fields(
+    DIRECTORY_SOURCE_FIELDS | SEARCH_USER_FIELDS | AUTOCOMPLETE_FIELDS | STAT_SOURCE_FIELDS | set(TOKEN_CLAIMS)
+)
+
+
+# Registered before every other User receiver, which skip saves that leave their fields unchanged.
+@receiver(pre_save, sender=User)
+def remember_changed_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._changed_fields = None if raw else instance.changed_fields(update_fields)
+
+
+def _changed(instance):
+    # None when unknown: a create, a delete, or an instance not loaded from the database
+    return instance.__dict__.get('_changed_fields')
+
+
+def _touches(instance, fields):
+    changed = _changed(instance)
+    return changed is None or not fields.isdisjoint(changed)
+
+
+def _unlisted_create(instance, created):
+    # Only verified members are listed and searchable, so there is nothing to sync for other new users.
+    return created and not (instance.verified and not instance.is_staff)
+
+
+# Registered before invalidate_directory, so the entry is current before the cached pages are dropped.
+@receiver(post_save, sender=User)
+def update_directory_entry(sender, instance, created=False, raw=False, **kwargs):
+    if raw or _unlisted_create(instance, created) or not _touches(instance, DIRECTORY_SOURCE_FIELDS):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: sync_directory([user_id]))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_directory(sender, instance, created=False, **kwargs):
+    if not _touches(instance, DIRECTORY_SOURCE_FIELDS):
+        return
+
+    scopes = [f"id:{instance.pk}", f"organization:{instance.is_organization}"]
+    changed = _changed(instance)
+    if not created and (changed is None or 'is_organization' in changed):
+        # The flag may have flipped, in which case the other listing lost this user.
+        scopes.append(f"organization:{not instance.is_organization}")
+    transaction.on_commit(lambda: bump_version(User, *scopes))
+
+
+def invalidate_section_lists(sender, **kwargs):
+    # After the commit, so a concurrent read cannot cache the uncommitted rows under the new version.
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+for section_model in SECTION_MODELS:
+    post_save.connect(invalidate_section_lists, sender=section_model)
+    post_delete.connect(invalidate_section_lists, sender=section_model)
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_claim_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Access tokens embed these claims, so a demotion or deactivation must revoke them.
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    changed = _changed(instance)
+    if changed is not None:
+        if not changed.isdisjoint(TOKEN_CLAIMS):
+            revoke_user_tokens(instance.pk)
+        return
+
+    # Built by hand rather than loaded, so the stored claims have to be read.
+    fields = set(TOKEN_CLAIMS) if update_fields is None else set(TOKEN_CLAIMS).intersection(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if stored is not None and any(stored[field] != getattr(instance, field) for field in fields):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    # Access tokens authenticate from their claims alone, so they outlive the row unless revoked.
+    user_id = instance.pk
+    transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
+@receiver(post_save, sender=User)
+def update_search_index(sender, instance, created=False, raw=False, **kwargs):
+    if raw or _unlisted_create(instance, created) or not _touches(instance, SEARCH_USER_FIELDS):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: index_users([user_id]))
+
+
+@receiver(post_delete, sender=User)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_users([instance.pk])
+
+
+# Searchable section model -> the User foreign key pointing at it
+SEARCH_SECTION_FIELDS = {User._meta.get_field(field).related_model: field for field in SEARCH_SECTIONS}
+
+
+def reindex_section_owners(sender, instance, created=False, raw=False, **kwargs):
+    # A new row has no owner until the user's foreign key is saved, which re-indexes them.
+    if raw or created:
+        return
+    index_users(User.objects.filter(**{SEARCH_SECTION_FIELDS[sender]: instance}).values_list('id', flat=True))
+
+
+def remember_section_owners(sender, instance, **kwargs):
+    # Deleting the row nulls the owners' foreign keys without signals; collect them first.
+    instance._search_owner_ids = list(
+        User.objects.filter(**{SEARCH_SECTION_FIELDS[sender]: instance}).values_list('id', flat=True)
+    )
+
+
+def reindex_former_owners(sender, instance, **kwargs):
+    index_users(getattr(instance, '_search_owner_ids', ()))
+
+
+for section_model in SEARCH_SECTION_FIELDS:
+    post_save.connect(reindex_section_owners, sender=section_model)
+    pre_delete.connect(remember_section_owners, sender=section_model)
+    post_delete.connect(reindex_former_owners, sender=section_model)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def update_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw or not _touches(instance, AUTOCOMPLETE_FIELDS):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: prefix_index.refresh([user_id]))
+
+
+@receiver(pre_save, sender=AnnualMembershipFee)
+def remember_receipt_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._stored_status = AnnualMembershipFee.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=AnnualMembershipFee)
+def count_receipt_status(sender, instance, created=False, raw=False, **kwargs):
+    stored = instance.__dict__.pop('_stored_status', None)
+    if raw:
+        return
+    if created:
+        adjust_receipt_counts({instance.status: 1})
+    elif stored is not None and stored != instance.status:
+        adjust_receipt_counts({stored: -1, instance.status: 1})
+        move_fee_status({instance.pk: stored}, instance.status)
+
+
+@receiver(post_delete, sender=AnnualMembershipFee)
+def uncount_receipt(sender, instance, **kwargs):
+    adjust_receipt_counts({instance.status: -1})
+
+
+@receiver(pre_delete, sender=AnnualMembershipFee)
+def move_payers_to_unknown_fee_status(sender, instance, **kwargs):
+    # The payers' foreign keys are nulled without signals once the delete proceeds.
+    move_fee_status({instance.pk: instance.status}, None)
+
+
+@receiver(pre_save, sender=User)
+def remember_member_facets(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or instance._state.adding or not _touches(instance, STAT_SOURCE_FIELDS):
+        return
+    instance._stat_facets = list(member_facets([instance.pk]).values())
+
+
+@receiver(post_save, sender=User)
+def update_member_stats(sender, instance, created=False, raw=False, **kwargs):
+    before = instance.__dict__.pop('_stat_facets', None)
+    if raw or (before is None and not created):
+        return
+    # The facets are read now, since a later save in the same transaction takes its own before/after pair.
+    after = list(member_facets([instance.pk]).values())
+    transaction.on_commit(lambda: adjust_member_stats(before or (), after))
+
+
+@receiver(pre_delete, sender=User)
+def remember_deleted_member_facets(sender, instance, **kwargs):
+    instance._stat_facets = list(member_facets([instance.pk]).values())
+
+
+@receiver(post_delete, sender=User)
+def uncount_member(sender, instance, **kwargs):
+    adjust_member_stats(before=instance.__dict__.pop('_stat_facets', ()))
+
+
+# Registered last, so a delete or a later save does not reuse this save's changes.
+@receiver(post_save, sender=User)
+def forget_changed_fields(sender, instance, **kwargs):
+    instance.__dict__.pop('_changed_fields', None)
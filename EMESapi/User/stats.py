@@ -0,0 +1,128 @@
+"""
+Member statistics for the admin dashboard, kept as a snapshot of counts.
+
+``MemberStatCount`` holds the number of members (non-staff users) per value
+of every facet in ``STAT_FACETS``. The ``User`` signals read a member's facets
+before and after a save that changes ``STAT_SOURCE_FIELDS`` and move the
+difference once the transaction commits. The fee signals move members
+between fee statuses when their receipt is reviewed or deleted. Bulk writes
+that bypass signals do the same through ``adjust_member_stats`` and
+``move_fee_status``. Edits made in place to an education row are not tracked,
+so ``manage.py recompute_stats`` rebuilds the snapshot periodically from
+grouped counts.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from utils.cache import bump_version
+from .models import MemberStatCount, User
+
+# Facet -> the User column or joined column it counts
+STAT_FACETS = {
+    'verified': 'verified',
+    'organization': 'is_organization',
+    'nationality': 'nationality',
+    'sex': 'sex',
+    'highest_degree': 'education__highest_degree',
+    'fee_status': 'payment__status',
+}
+
+# User columns the facets are read from, or that decide whether the user is counted
+STAT_SOURCE_FIELDS = {'verified', 'is_organization', 'nationality', 'sex', 'education', 'payment', 'is_staff'}
+
+# Value counted for members with nothing set
+UNKNOWN = 'unknown'
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value) if value not in (None, '') else UNKNOWN
+
+
+def member_facets(user_ids):
+    """
+    Reads the facet values of the given users in one joined query.
+
+    :return: ``{user id: {facet: value}}``; staff and missing users are left out.
+    """
+    rows = User.objects.filter(id__in=set(user_ids), is_staff=False).values_list('id', *STAT_FACETS.values())
+    return {row[0]: dict(zip(STAT_FACETS, map(_value, row[1:]))) for row in rows}
+
+
+def _apply(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        MemberStatCount.objects.bulk_create(
+            [MemberStatCount(facet=facet, value=value) for facet, value in deltas], ignore_conflicts=True,
+        )
+        for (facet, value), delta in deltas.items():
+            MemberStatCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+        transaction.on_commit(lambda: bump_version(MemberStatCount))
+
+
+def adjust_member_stats(before=(), after=()):
+    """
+    Moves members from the facet values they had to the ones they have now.
+
+    :param before: Iterable of ``member_facets`` dicts no longer counted.
+    :param after: Iterable of ``member_facets`` dicts to count.
+    """
+    deltas = Counter(item for facets in after for item in facets.items())
+    deltas.subtract(item for facets in before for item in facets.items())
+    _apply(deltas)
+
+
+def move_fee_status(previous_statuses, status):
+    """
+    Moves the members paying with the given fees to ``status``.
+
+    :param previous_statuses: ``{fee id: status before the change}``.
+    :param status: The fees' new status, or None if they were deleted.
+    """
+    payers = Counter(
+        User.objects.filter(payment_id__in=list(previous_statuses), is_staff=False).values_list('payment_id', flat=True)
+    )
+    if not payers:
+        return
+    deltas = Counter({('fee_status', _value(status)): sum(payers.values())})
+    deltas.subtract({('fee_status', _value(previous_statuses[fee_id])): count for fee_id, count in payers.items()})
+    _apply(deltas)
+
+
+def recompute_member_stats():
+    """
+    Rebuilds the snapshot with one grouped count per facet.
+
+    :return: The new ``member_stats()``.
+    """
+    members = User.objects.filter(is_staff=False)
+    with transaction.atomic():
+        counts = Counter()
+        for facet, column in STAT_FACETS.items():
+            for value, count in members.values_list(column).annotate(count=Count('id')).order_by():
+                # NULL and '' are both counted as UNKNOWN.
+                counts[facet, _value(value)] += count
+        MemberStatCount.objects.all().delete()
+        MemberStatCount.objects.bulk_create(
+            [MemberStatCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()]
+        )
+        transaction.on_commit(lambda: bump_version(MemberStatCount))
+    return member_stats()
+
+
+def member_stats():
+    """
+    The snapshot as ``{"members": total, facet: {value: count}}``, values ordered by count.
+    """
+    stats = {'members': 0, **{facet: {} for facet in STAT_FACETS}}
+    rows = MemberStatCount.objects.filter(count__gt=0).order_by('facet', '-count', 'value')
+    for facet, value, count in rows.values_list('facet', 'value', 'count'):
+        if facet in stats:
+            stats[facet][value] = count
+    stats['members'] = sum(stats['verified'].values())
+    return stats
@@ -1,3 +1,876 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient
+
+from utils import hashing
+from utils.throttling import check_rates, parse_rate, validate_rates
+from utils.tokens import issue_tokens
+from .autocomplete import PrefixIndex, prefix_index
+from .compaction import compact_sections
+from .derivatives import generate_derivatives_now
+from .models import (
+    Address, AnnualMembershipFee, Award, CompactionCheckpoint, Contact, DirectoryEntry, Education, OutboundEmail,
+    ProfessionalExperience, Publications, ReceiptStatusCount, StoredBlob, User, ViewRequests,
+)
+from .moderation import moderate
+from .receipts import receipt_counts, recount_receipts
+from .search import rebuild_search_index
+from .stats import member_stats, recompute_member_stats
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ApproveRequestTests(TestCase):
+    def setUp(self):
+        self.requested = User.objects.create(username='requested', first_name='Ann', verified=True)
+        admin = User.objects.create(username='admin', is_staff=True, verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def approve(self, issuer):
+        view_request = ViewRequests.objects.create(issuer=issuer, requested_user=self.requested)
+        response = self.client.delete(f'/api/admin/requests/{view_request.id}/approve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ViewRequests.objects.filter(id=view_request.id).exists())
+
+    def test_email_is_queued_then_delivered_by_send_outbox(self):
+        contact = Contact.objects.create(email='issuer@example.com', phone_number='1')
+        self.approve(User.objects.create(username='issuer', contact=contact))
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.recipients), (OutboundEmail.PENDING, ['issuer@example.com']))
+        self.assertEqual(mail.outbox, [])
+
+        call_command('send_outbox', once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['issuer@example.com'])
+        self.assertIn('Ann', mail.outbox[0].alternatives[0][0])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+
+    def test_issuer_without_email_is_approved_without_queueing(self):
+        self.approve(User.objects.create(username='issuer'))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = User.objects.create(username='admin', is_staff=True, verified=True)
+            self.pending = User.objects.create(username='pending')
+            self.member = User.objects.create(username='member', verified=True)
+            contact = Contact.objects.create(email='issuer@example.com', phone_number='1')
+            self.issuer = User.objects.create(username='issuer', verified=True, contact=contact)
+            self.no_email = User.objects.create(username='no_email', verified=True)
+            self.pending_fee = AnnualMembershipFee.objects.create(receipt='/r1.pdf', status=AnnualMembershipFee.PENDING)
+            self.accepted_fee = AnnualMembershipFee.objects.create(receipt='/r2.pdf', status=AnnualMembershipFee.ACCEPTED)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def moderate(self, operations):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/moderation/', operations, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['results']
+
+    def test_outcomes_and_derived_data(self):
+        emailed = ViewRequests.objects.create(issuer=self.issuer, requested_user=self.member)
+        unemailed = ViewRequests.objects.create(issuer=self.no_email, requested_user=self.member)
+        rejected = ViewRequests.objects.create(issuer=self.issuer, requested_user=self.no_email)
+
+        results = self.moderate({
+            'verify_users': [self.pending.id, self.member.id, 999],
+            'promote_users': [self.member.id],
+            'accept_receipts': [self.pending_fee.id, self.accepted_fee.id],
+            'approve_requests': [emailed.id, unemailed.id],
+            'reject_requests': [rejected.id, 998],
+        })
+
+        self.assertEqual(results['verify_users'], {
+            self.pending.id: 'verified', self.member.id: 'already_verified', 999: 'not_found',
+        })
+        self.assertEqual(results['promote_users'], {self.member.id: 'promoted'})
+        self.assertEqual(results['accept_receipts'], {
+            self.pending_fee.id: 'accepted', self.accepted_fee.id: 'already_accepted',
+        })
+        self.assertEqual(results['approve_requests'], {emailed.id: 'approved', unemailed.id: 'approved_without_email'})
+        self.assertEqual(results['reject_requests'], {rejected.id: 'rejected', 998: 'not_found'})
+
+        self.assertFalse(ViewRequests.objects.exists())
+        self.assertEqual(OutboundEmail.objects.get().recipients, ['issuer@example.com'])
+        # The directory lists the newly verified member and drops the promoted one.
+        self.assertEqual(
+            set(DirectoryEntry.objects.values_list('username', flat=True)), {'pending', 'issuer', 'no_email'},
+        )
+        self.assertEqual(receipt_counts(), recount_receipts())
+        self.assertEqual(member_stats(), recompute_member_stats())
+
+    def test_malformed_operations_are_rejected(self):
+        for operations in ({'bogus': [1]}, {'verify_users': ['x']}, []):
+            with self.subTest(operations=operations):
+                response = self.client.post('/api/admin/moderation/', operations, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(AUTH_TOKEN_MODE='jwt', THROTTLE_RATES={})
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='member', verified=True)
+
+    def status_with(self, access):
+        return self.client.get('/api/search/?q=member', HTTP_AUTHORIZATION=f'Bearer {access}').status_code
+
+    def test_claim_change_revokes_earlier_tokens_only(self):
+        access = issue_tokens(self.user)['access']
+        self.assertEqual(self.status_with(access), 200)
+
+        self.user.verified = False
+        self.user.save()
+        self.assertEqual(self.status_with(access), 401)
+        # Issued within the same second as the revocation, yet after it.
+        self.assertEqual(self.status_with(issue_tokens(self.user)['access']), 200)
+
+    def test_save_without_claim_change_keeps_tokens(self):
+        access = issue_tokens(self.user)['access']
+        self.user.first_name = 'Ann'
+        self.user.save()
+        self.assertEqual(self.status_with(access), 200)
+
+    def test_deleting_the_user_revokes_tokens(self):
+        access = issue_tokens(self.user)['access']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.status_with(access), 401)
+
+    def test_bulk_promotion_revokes_tokens(self):
+        access = issue_tokens(self.user)['access']
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create(username='admin', is_staff=True, verified=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.post('/api/admin/moderation/', {'promote_users': [self.user.id]}, format='json')
+        self.assertEqual(self.status_with(access), 401)
+
+    def test_registered_organization_token_is_accepted(self):
+        response = self.client.post(
+            '/api/register/?is_organization=true', {'username': 'org', 'password': 'pw'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(User.objects.get(username='org').is_organization)
+        self.assertEqual(self.status_with(response.json()['access']), 200)
+
+
+class CompactionTests(TestCase):
+    def address(self, age=timedelta(days=2)):
+        address = Address.objects.create(residential='r', employer='e', city='c', country='k')
+        Address.objects.filter(pk=address.pk).update(updated_at=timezone.now() - age)
+        return address
+
+    def test_only_unreferenced_rows_past_the_grace_period_are_deleted(self):
+        self.address()
+        referenced = self.address()
+        User.objects.create(username='member', address=referenced)
+        # Created through the router, not yet pointed at by its user
+        recent = self.address(age=timedelta(minutes=5))
+
+        report = compact_sections(grace=timedelta(hours=1)).as_dict()
+
+        self.assertEqual(report['rows'], {'Address': 1})
+        self.assertEqual(set(Address.objects.values_list('pk', flat=True)), {referenced.pk, recent.pk})
+        self.assertFalse(CompactionCheckpoint.objects.exists())
+
+    def test_dry_run_deletes_nothing(self):
+        self.address()
+        self.assertEqual(compact_sections(dry_run=True, grace=timedelta(hours=1)).as_dict()['total_rows'], 1)
+        self.assertEqual(Address.objects.count(), 1)
+
+    def test_interrupted_run_resumes_after_its_checkpoint(self):
+        first = self.address()
+        self.address()
+        CompactionCheckpoint.objects.create(table=Address._meta.label_lower, last_id=first.pk)
+
+        compact_sections(batch_size=1, grace=timedelta(hours=1))
+        self.assertEqual(list(Address.objects.values_list('pk', flat=True)), [first.pk])
+        self.assertFalse(CompactionCheckpoint.objects.exists())
+
+        # A finished table starts over on the next run.
+        compact_sections(batch_size=1, grace=timedelta(hours=1))
+        self.assertFalse(Address.objects.exists())
+
+
+@override_settings(THROTTLE_RATES={'login': {'ip': '', 'username': '2/minute'}})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username):
+        return self.client.post('/api/login/', {'username': username, 'password': 'x'}, content_type='application/json')
+
+    @mock.patch('User.views.authenticate', return_value=None)
+    def test_username_limit_is_case_insensitive_and_per_username(self, authenticate):
+        self.assertEqual([self.login('Bob').status_code for _ in range(2)], [400, 400])
+        response = self.login('bob')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Rejected before any password check
+        self.assertEqual(authenticate.call_count, 2)
+        self.assertEqual(self.login('alice').status_code, 400)
+
+    def test_rate_allowing_no_requests_is_rejected(self):
+        self.assertEqual(parse_rate('5/minute'), (5, 60))
+        self.assertIsNone(parse_rate(''))
+        with self.assertRaises(ImproperlyConfigured):
+            parse_rate('0/minute')
+
+    def test_rates_are_validated_up_front(self):
+        rates = {'login': {'ip': '60/minute', 'username': ''}}
+        with override_settings(THROTTLE_RATES=rates):
+            self.assertEqual(validate_rates(), {'login': [('ip', 60, 60)]})
+        for rate in ('0/minute', 'often', '5/fortnight', '/minute'):
+            with self.subTest(rate=rate), override_settings(THROTTLE_RATES={'login': {'ip': rate}}):
+                with self.assertRaises(ImproperlyConfigured):
+                    validate_rates()
+
+    @override_settings(THROTTLE_RATES={'login': {'ip': '2/minute'}})
+    @mock.patch('utils.throttling.time.time', return_value=630.0)
+    def test_rejected_requests_are_not_counted(self, now):
+        idents = {'ip': '10.0.0.1'}
+        self.assertEqual([check_rates('login', idents) for _ in range(4)], [None, None, 30, 30])
+        # Half of the previous window still counts: one of its two admitted requests.
+        now.return_value = 690.0
+        self.assertIsNone(check_rates('login', idents))
+
+
+class ChangedFieldTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username='member', verified=True, nationality='ET')
+        self.user = User.objects.get(pk=self.user.pk)
+
+    def test_changed_fields_compares_with_the_loaded_values(self):
+        self.assertEqual(self.user.changed_fields(), set())
+        self.user.first_name = 'Ann'
+        self.user.nationality = 'ET'
+        self.assertEqual(self.user.changed_fields(), {'first_name'})
+        self.assertEqual(self.user.changed_fields(update_fields=['nationality']), set())
+        self.user.save()
+        self.assertEqual(self.user.changed_fields(), set())
+        self.assertIsNone(User(username='new').changed_fields())
+
+    def test_deferred_fields_count_as_changed_once_set(self):
+        user = User.objects.only('id', 'username').get(pk=self.user.pk)
+        user.first_name = 'Ann'
+        self.assertEqual(user.changed_fields(update_fields=['first_name']), {'first_name'})
+
+    def test_save_changing_no_tracked_field_skips_the_handlers(self):
+        self.user.services_or_productions = ['consulting']
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        self.assertEqual(callbacks, [])
+
+    def test_tracked_change_reaches_the_directory_and_stats(self):
+        self.user.first_name = 'Ann'
+        self.user.nationality = 'KE'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(DirectoryEntry.objects.get(user=self.user).full_name, 'Ann')
+        self.assertEqual(member_stats()['nationality'], {'KE': 1})
+        self.assertEqual(member_stats(), recompute_member_stats())
+
+
+class VersionedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='org', verified=True, is_organization=True)
+            self.member = User.objects.create(username='member', verified=True)
+        self.client = APIClient()
+
+    def test_directory_pages_are_dropped_only_for_their_scope(self):
+        self.client.get('/api/users/?organization=true')
+        self.client.get('/api/users/?organization=false')
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/?organization=true')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.nationality = 'ET'
+            self.member.save()
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/?organization=true')
+        self.assertEqual(self.client.get('/api/users/?organization=false').data['results'][0]['nationality'], 'ET')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.is_organization = True
+            self.member.save()
+        self.assertEqual(len(self.client.get('/api/users/?organization=true').data['results']), 2)
+        self.assertEqual(self.client.get('/api/users/?organization=false').data['results'], [])
+
+    def test_section_list_is_dropped_once_the_write_commits(self):
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True, verified=True))
+        self.assertEqual(self.client.get('/api/awards/').data, [])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Award.objects.create(title='Medal', awarding_body='Board', year='2020')
+            # Not committed yet, so the cached list still stands.
+            self.assertEqual(self.client.get('/api/awards/').data, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual([award['title'] for award in self.client.get('/api/awards/').data], ['Medal'])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = User.objects.create(username='first', verified=True)
+            self.second = User.objects.create(username='second', verified=True)
+
+    def test_listing_is_validated_by_etag_only(self):
+        response = self.client.get('/api/users/')
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        response = self.client.get('/api/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['username'] for user in response.data['results']], ['first'])
+        # A deletion does not move any timestamp forward, so If-Modified-Since is not honoured.
+        future = http_date(time.time() + 60)
+        self.assertEqual(self.client.get('/api/users/', HTTP_IF_MODIFIED_SINCE=future).status_code, 200)
+
+    def test_detail_answers_both_validators(self):
+        response = self.client.get(f'/api/users/{self.first.id}/')
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(f'/api/users/{self.first.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(f'/api/users/{self.first.id}/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.nationality = 'ET'
+            self.first.save()
+        self.assertEqual(self.client.get(f'/api/users/{self.first.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ReceiptReviewTests(TestCase):
+    def setUp(self):
+        self.fees = []
+        for number in range(5):
+            fee = AnnualMembershipFee.objects.create(receipt=f'/media/r{number}.pdf', status=AnnualMembershipFee.PENDING)
+            User.objects.create(username=f'payer{number}', payment=fee)
+            self.fees.append(fee)
+        AnnualMembershipFee.objects.create(receipt='/media/orphan.pdf', status=AnnualMembershipFee.ACCEPTED)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True, verified=True))
+
+    def test_queue_pages_oldest_first_with_the_payer_and_totals(self):
+        with self.assertNumQueries(2):
+            body = self.client.get('/api/admin/receipts/?page_size=2').json()
+        self.assertEqual(body['counts'], {'Pending': 5, 'Accepted': 1, 'Rejected': 0})
+        self.assertEqual(body['results'][0]['user']['username'], 'payer0')
+        seen = [row['id'] for row in body['results']]
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            seen += [row['id'] for row in body['results']]
+        self.assertEqual(seen, [fee.id for fee in self.fees])
+
+        self.assertIsNone(self.client.get('/api/admin/receipts/?status=accepted').json()['results'][0]['user'])
+        self.assertEqual(self.client.get('/api/admin/receipts/?status=x').status_code, 400)
+
+    def test_totals_follow_every_kind_of_change(self):
+        response = self.client.patch(
+            f'/api/admin/receipts/{self.fees[0].id}/status/', {'status': 'Rejected'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            moderate({'accept_receipts': [fee.id for fee in self.fees[:3]]})
+        self.fees[3].delete()
+        self.assertEqual(receipt_counts(), {'Pending': 1, 'Accepted': 4, 'Rejected': 0})
+        self.assertEqual(recount_receipts(), receipt_counts())
+
+    def test_unknown_statuses_are_rejected(self):
+        fee = self.fees[0]
+        for path, method in (
+            (f'/api/admin/receipts/{fee.id}/status/', self.client.patch),
+            (f'/api/annual_membership_fees/{fee.id}/update_status/', self.client.post),
+            (f'/api/annual_membership_fees/{fee.id}/', self.client.patch),
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(method(path, {'status': 'Refunded'}, format='json').status_code, 400)
+        self.assertFalse(ReceiptStatusCount.objects.filter(status='Refunded').exists())
+
+        response = self.client.post(
+            f'/api/annual_membership_fees/{fee.id}/update_status/', {'status': 'Accepted'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(receipt_counts(), {'Pending': 4, 'Accepted': 2, 'Rejected': 0})
+
+
+@override_settings(
+    PASSWORD_HASHERS=['utils.hashing.PooledPBKDF2PasswordHasher'], PASSWORD_HASH_WORKERS=1,
+    PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_QUEUE_MAX=0, THROTTLE_RATES={},
+)
+@mock.patch.object(PBKDF2PasswordHasher, 'iterations', 1)
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True, verified=True))
+
+    def import_lines(self, *lines):
+        upload = SimpleUploadedFile('members.ndjson', '\n'.join(lines).encode())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/admin/users/import/', {'file': upload}, format='multipart')
+
+    def test_import_hashes_outside_the_request_pool(self):
+        # Every request hashing slot is taken: registration is turned away, imports are not.
+        with mock.patch.object(hashing, '_pending', 1):
+            response = self.client.post('/api/admin/register/', {'username': 'bob', 'password': 'pw'}, format='json')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+
+            response = self.import_lines(
+                '{"username": "m1", "password": "pw", "verified": true}',
+                '{"username": "m2", "password": "pw", "first_name": "Imported", "verified": true}',
+                '{"username": "nopw"}',
+                '{"username": "m1", "password": "pw"}',
+                '{bad',
+            )
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 2))
+        self.assertTrue(PBKDF2PasswordHasher().verify('pw', User.objects.get(username='m2').password))
+        self.assertFalse(User.objects.get(username='nopw').has_usable_password())
+        self.assertTrue(DirectoryEntry.objects.filter(user__username='m2', full_name='Imported').exists())
+
+
+@override_settings(THROTTLE_RATES={})
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members = [
+                User.objects.create(username=f'member{number}', verified=True, is_organization=number % 2 == 0)
+                for number in range(5)
+            ]
+        self.access = issue_tokens(User.objects.create(username='viewer', verified=True))['access']
+
+    async def test_directory_pages_like_the_sync_view(self):
+        body = (await self.async_client.get('/api/async/users/?page_size=2')).json()
+        seen = [row['username'] for row in body['results']]
+        while body['next']:
+            body = (await self.async_client.get(body['next'])).json()
+            seen += [row['username'] for row in body['results']]
+        self.assertEqual(seen, [member.username for member in self.members])
+
+        body = (await self.async_client.get(body['previous'])).json()
+        self.assertEqual([row['username'] for row in body['results']], ['member2', 'member3'])
+        sync_body = await sync_to_async(lambda: APIClient().get('/api/users/?page_size=2&organization=true').json())()
+        async_body = (await self.async_client.get('/api/async/users/?page_size=2&organization=true')).json()
+        self.assertEqual(async_body['results'], sync_body['results'])
+        self.assertEqual((await self.async_client.get('/api/async/users/?cursor=bogus')).status_code, 404)
+
+    async def test_duplicate_view_request_is_rejected(self):
+        path = f'/api/async/users/{self.members[0].id}/view-request/'
+        headers = {'Authorization': f'Bearer {self.access}'}
+        self.assertEqual((await self.async_client.post(path, headers=headers)).status_code, 201)
+        self.assertEqual((await self.async_client.post(path, headers=headers)).status_code, 400)
+        self.assertEqual(await ViewRequests.objects.acount(), 1)
+
+    @override_settings(THROTTLE_RATES={'view_request': {'username': '1/minute'}})
+    async def test_view_requests_are_throttled(self):
+        headers = {'Authorization': f'Bearer {self.access}'}
+        await self.async_client.post(f'/api/async/users/{self.members[0].id}/view-request/', headers=headers)
+        response = await self.async_client.post(f'/api/async/users/{self.members[1].id}/view-request/', headers=headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+
+class DirectoryPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members = [
+                User.objects.create(username=f'member{number}', verified=True, is_organization=number % 2 == 0)
+                for number in range(5)
+            ]
+            User.objects.create(username='staff', verified=True, is_staff=True)
+            User.objects.create(username='unverified')
+        self.client = APIClient()
+
+    def test_pages_follow_the_cursor_in_id_order(self):
+        with self.assertNumQueries(2):
+            body = self.client.get('/api/users/?page_size=2').data
+        seen = [row['username'] for row in body['results']]
+        while body['next']:
+            body = self.client.get(body['next']).data
+            seen += [row['username'] for row in body['results']]
+        self.assertEqual(seen, [member.username for member in self.members])
+        self.assertEqual(
+            [row['username'] for row in self.client.get('/api/users/?organization=true').data['results']],
+            ['member0', 'member2', 'member4'],
+        )
+        self.assertEqual(self.client.get('/api/users/?organization=x').status_code, 400)
+
+    def test_entries_carry_only_the_public_columns(self):
+        entry = self.client.get(f'/api/users/{self.members[1].id}/').data
+        self.assertEqual(
+            set(entry), {'id', 'username', 'full_name', 'nationality', 'sex', 'profile_picture_variants'},
+        )
+        self.assertEqual(entry['full_name'], 'member1')
+        listed = self.client.get('/api/users/').data['results'][0]
+        self.assertEqual(listed, self.client.get(f'/api/users/{self.members[0].id}/').data)
+
+
+def use_temporary_media(test):
+    """Points MEDIA_ROOT at a directory removed after ``test``; returns its path."""
+    media = tempfile.TemporaryDirectory()
+    test.addCleanup(media.cleanup)
+    media_settings = override_settings(MEDIA_ROOT=media.name)
+    media_settings.enable()
+    test.addCleanup(media_settings.disable)
+    return media.name
+
+
+@override_settings(UPLOAD_MAX_BYTES=1000)
+class UploadTests(TestCase):
+    def setUp(self):
+        self.media_root = use_temporary_media(self)
+        self.user = User.objects.create(username='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, path, field, content, **data):
+        upload = SimpleUploadedFile('file.pdf', content)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(path, {field: upload, **data}, format='multipart')
+
+    def test_identical_files_are_stored_once(self):
+        self.assertEqual(self.upload('/api/upload-receipt/', 'receipt', b'x' * 500).status_code, 201)
+        response = self.upload('/api/upload-degree/', 'degree_file', b'x' * 500, highest_degree='MSc')
+        self.assertEqual(response.status_code, 201)
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.size, blob.ref_count), (500, 2))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, blob.path)))
+
+    @mock.patch('User.views.schedule_derivatives')
+    def test_replaced_profile_picture_is_released(self, schedule_derivatives):
+        self.upload('/api/upload-profile-picture/', 'profile_picture', b'first')
+        first = StoredBlob.objects.get().path
+        self.upload('/api/upload-profile-picture/', 'profile_picture', b'second')
+        self.assertFalse(StoredBlob.objects.filter(path=first).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, first)))
+
+    def test_oversized_uploads_are_rejected(self):
+        for size in (1001, 100000):
+            with self.subTest(size=size):
+                self.assertEqual(self.upload('/api/upload-receipt/', 'receipt', b'x' * size).status_code, 413)
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(os.listdir(self.media_root), [])
+
+
+class DerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = use_temporary_media(self)
+        cache.clear()
+        self.user = User.objects.create(username='member', verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload_picture(self):
+        picture = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(picture, 'JPEG')
+        upload = SimpleUploadedFile('picture.jpg', picture.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/upload-profile-picture/', {'profile_picture': upload}, format='multipart')
+        return response.data['profile_picture_variants']
+
+    def variant_file(self, url):
+        return os.path.join(self.media_root, url[len('/media/'):])
+
+    @mock.patch('User.views.schedule_derivatives', side_effect=generate_derivatives_now)
+    def test_variants_are_square_and_served_as_immutable(self, schedule_derivatives):
+        variants = self.upload_picture()
+        self.assertEqual(set(variants), {'64', '256', '512'})
+        self.assertEqual(Image.open(self.variant_file(variants['512'])).size, (512, 512))
+
+        response = self.client.get(variants['64'])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).size, (64, 64))
+        self.assertEqual(self.client.get('/api/users/').data['results'][0]['profile_picture_variants'], variants)
+
+    @mock.patch('User.views.schedule_derivatives')
+    def test_missing_variants_redirect_and_are_backfilled(self, schedule_derivatives):
+        variants = self.upload_picture()
+        self.assertEqual(self.client.get(variants['512']).status_code, 302)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get(f'/media/derivatives/../{self.user.profile_picture.name}').status_code, 404)
+
+        call_command('generate_derivatives', stdout=StringIO())
+        self.assertTrue(os.path.exists(self.variant_file(variants['512'])))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experience = ProfessionalExperience.objects.create(
+                organization='Ethio Telecom', position='Network engineer', key_responsibilities='Fiber rollout',
+                start_time=timezone.now(),
+            )
+            self.alice = User.objects.create(
+                username='alice', verified=True, professional_experience=self.experience,
+            )
+            self.publication = Publications.objects.create(
+                title='Engineering bridges', journal='Zede', date=timezone.now(),
+            )
+            self.bob = User.objects.create(username='bob', verified=True, publications=self.publication)
+            User.objects.create(username='carol', verified=False, professional_experience=self.experience)
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def search(self, query, **params):
+        return [row['username'] for row in self.client.get('/api/search/', {'q': query, **params}).data['results']]
+
+    def test_matches_across_sections_and_only_listed_members(self):
+        self.assertEqual(set(self.search('engineer')), {'alice', 'bob'})
+        self.assertEqual(self.search('telecom'), ['alice'])
+        self.assertEqual(self.client.get('/api/search/', {'q': 'AND "( NEAR'}).status_code, 200)
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(APIClient().get('/api/search/', {'q': 'engineer'}).status_code, 401)
+
+    def test_section_and_user_writes_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experience.organization = 'EEP'
+            self.experience.save()
+        self.assertEqual(self.search('telecom'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication.delete()
+        self.assertEqual(self.search('bridges'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.verified = False
+            self.alice.save(update_fields=['verified'])
+        self.assertEqual(self.search('alice'), [])
+
+    def test_rebuild_indexes_every_user(self):
+        self.assertEqual(rebuild_search_index(batch_size=2), User.objects.count())
+        self.assertEqual(set(self.search('engineer')), {'alice', 'bob'})
+
+
+@override_settings(AUTOCOMPLETE_SYNC_SECONDS=0)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Built by earlier tests from rows they rolled back
+        patcher = mock.patch.object(prefix_index, '_built', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='abebe', verified=True)
+            User.objects.create(username='Abel', verified=True)
+            self.abraham = User.objects.create(username='abraham')
+            User.objects.create(username='abstaff', verified=True, is_staff=True)
+            self.airline = User.objects.create(
+                username='et_air', first_name='Ethiopian', last_name='Airlines', verified=True, is_organization=True,
+            )
+        self.client = APIClient()
+
+    def complete(self, prefix):
+        return [row['username'] for row in self.client.get('/api/users/autocomplete/', {'q': prefix}).data['results']]
+
+    def test_prefixes_match_usernames_and_organization_words(self):
+        self.assertEqual(self.complete('ab'), ['abebe', 'Abel'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('air'), ['et_air'])
+        self.assertEqual(self.client.get('/api/users/autocomplete/').status_code, 400)
+
+    def test_other_processes_replay_the_change_log(self):
+        other = PrefixIndex()
+        self.assertEqual([row['username'] for row in other.lookup('ab', 5)], ['abebe', 'Abel'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.abraham.verified = True
+            self.abraham.save(update_fields=['verified'])
+            User.objects.filter(username='abebe').delete()
+            self.airline.first_name = 'Ethio'
+            self.airline.save()
+        self.assertEqual([row['username'] for row in other.lookup('ab', 5)], ['Abel', 'abraham'])
+        self.assertEqual(other.lookup('ethiop', 5), [])
+        self.assertEqual(self.complete('ethio '), ['et_air'])
+
+
+class ProfileSectionsUpdateTests(TestCase):
+    payload = {
+        'address': {'residential': 'Bole', 'employer': 'EEP', 'city': 'Addis Ababa', 'country': 'Ethiopia'},
+        'contact': {'email': 'member@example.com', 'phone_number': '0911'},
+        'awards': {'title': 'Medal', 'awarding_body': 'Board', 'year': '2020'},
+    }
+
+    def setUp(self):
+        self.user = User.objects.create(username='member', verified=True, nationality='ET')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def update(self, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/user/update/', payload, format='json')
+
+    def test_sections_are_added_with_one_user_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.update(self.payload).status_code, 202)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "User_user"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('nationality', updates[0])
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.address.city, self.user.contact.phone_number, self.user.awards.year),
+                         ('Addis Ababa', '0911', '2020'))
+
+    def test_invalid_section_writes_nothing(self):
+        response = self.update({**self.payload, 'publications': {'title': 'Bridges', 'journal': 'Zede'}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['errors']), {'publications'})
+        self.assertFalse(Address.objects.exists())
+        for payload in ({'bogus': {}}, [1], {}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.update(payload).status_code, 400)
+
+    def test_failed_user_update_rolls_back_the_sections(self):
+        with mock.patch.object(User, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            self.update(self.payload)
+        self.assertFalse(Address.objects.exists())
+        self.assertFalse(Contact.objects.exists())
+        self.assertFalse(Award.objects.exists())
+
+
+class DirectorySyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member = User.objects.create(
+                username='member', first_name='Abebe', last_name='Kebede', verified=True, nationality='ET',
+            )
+            self.organization = User.objects.create(
+                username='org', first_name='Ethiopian Airlines', verified=True, is_organization=True,
+            )
+            User.objects.create(username='staff', verified=True, is_staff=True)
+            self.pending = User.objects.create(username='pending')
+
+    def save(self, user, **changes):
+        for name, value in changes.items():
+            setattr(user, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+    def listed(self):
+        return dict(DirectoryEntry.objects.values_list('username', 'full_name'))
+
+    def test_entries_follow_user_writes(self):
+        self.assertEqual(self.listed(), {'member': 'Abebe Kebede', 'org': 'Ethiopian Airlines'})
+        self.save(self.pending, verified=True)
+        self.save(self.member, first_name='Almaz')
+        self.assertEqual(self.listed(), {'member': 'Almaz Kebede', 'org': 'Ethiopian Airlines', 'pending': 'pending'})
+
+        self.save(self.member, is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.organization.delete()
+        self.assertEqual(self.listed(), {'pending': 'pending'})
+
+    def test_rebuild_restores_every_entry(self):
+        DirectoryEntry.objects.all().delete()
+        call_command('rebuild_directory', stdout=StringIO())
+        self.assertEqual(self.listed(), {'member': 'Abebe Kebede', 'org': 'Ethiopian Airlines'})
+
+
+@override_settings(
+    PASSWORD_HASHERS=['utils.hashing.PooledPBKDF2PasswordHasher'], PASSWORD_HASH_CONCURRENCY=1,
+    PASSWORD_HASH_QUEUE_MAX=0, THROTTLE_RATES={}, AUTH_TOKEN_MODE='token',
+)
+class HashingAdmissionTests(TestCase):
+    def setUp(self):
+        User.objects.create(username='member', password=PBKDF2PasswordHasher().encode('pw', 'salt', 1), verified=True)
+
+    @mock.patch.object(hashing, '_pending', 1)
+    def test_logins_are_turned_away_while_the_pool_is_full(self):
+        rejected = hashing.HASH_REJECTED._values.get((), 0)
+        for path in ('/api/login/', '/api/async/login/'):
+            with self.subTest(path=path):
+                response = self.client.post(path, {'username': 'member', 'password': 'pw'}, content_type='application/json')
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(hashing.HASH_REJECTED._values[()], rejected + 2)
+
+    def test_failed_submission_releases_its_slot(self):
+        with mock.patch.object(hashing, '_get_request_executor', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                hashing.run_hashing(len, 'pw')
+        self.assertEqual(hashing._pending, 0)
+
+
+class MemberStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fee = AnnualMembershipFee.objects.create(receipt='/media/r.pdf', status=AnnualMembershipFee.PENDING)
+            education = Education.objects.create(
+                highest_degree='MSc', field_of_study='Civil', university='AAU', graduation_year='2010',
+            )
+            self.member = User.objects.create(
+                username='member', nationality='ET', sex='F', payment=self.fee, education=education,
+            )
+            self.organization = User.objects.create(username='org', is_organization=True)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True, verified=True))
+
+    def assertInStep(self):
+        stats = member_stats()
+        self.assertEqual(stats, recompute_member_stats())
+        return stats
+
+    def test_counters_follow_user_fee_and_bulk_writes(self):
+        stats = self.assertInStep()
+        self.assertEqual(stats['members'], 2)
+        self.assertEqual(stats['highest_degree'], {'MSc': 1, 'unknown': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moderate({'accept_receipts': [self.fee.id], 'verify_users': [self.member.id],
+                      'promote_users': [self.organization.id]})
+        stats = self.assertInStep()
+        self.assertEqual((stats['members'], stats['fee_status'], stats['verified']),
+                         (1, {'Accepted': 1}, {'true': 1}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fee.status = AnnualMembershipFee.REJECTED
+            self.fee.save(update_fields=['status'])
+        self.assertEqual(self.assertInStep()['fee_status'], {'Rejected': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fee.delete()
+        self.assertEqual(self.assertInStep()['fee_status'], {'unknown': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+        self.assertEqual(self.assertInStep()['members'], 0)
+
+    def test_endpoint_serves_the_snapshot_from_cache(self):
+        self.assertEqual(self.client.get('/api/admin/stats/').json()['members'], 2)
+        with self.assertNumQueries(0):
+            self.client.get('/api/admin/stats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='newcomer')
+        self.assertEqual(self.client.get('/api/admin/stats/').json()['members'], 3)
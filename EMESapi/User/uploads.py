@@ -0,0 +1,130 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import StoredBlob
+
+# Room for the multipart boundaries and the small text fields sent alongside a file
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams each uploaded file to a temporary file in chunks while hashing it,
+    and stops reading the request as soon as a file grows past ``max_bytes``.
+    """
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.too_large = True
+            raise StopUpload(connection_reset=True)
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.hasher.hexdigest()
+        return uploaded_file
+
+
+def _too_large_response(max_bytes):
+    return Response(
+        {'error': f'File exceeds the maximum upload size of {max_bytes} bytes'},
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    )
+
+
+def read_upload(request, field_name, max_bytes=None):
+    """
+    Parses the multipart body of ``request`` through the hashing handler.
+
+    Must be called before anything else reads ``request.data`` or ``request.FILES``.
+
+    :param max_bytes: Largest accepted file; defaults to ``UPLOAD_MAX_BYTES``.
+    :return: Tuple ``(uploaded_file, error_response)``; ``uploaded_file`` is None
+        when the field is missing or the body was rejected.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_bytes + FORM_OVERHEAD_BYTES:
+        return None, _too_large_response(max_bytes)
+
+    handler = HashingUploadHandler(request, max_bytes=max_bytes)
+    request.upload_handlers = [handler]
+
+    uploaded_file = request.FILES.get(field_name)
+    if handler.too_large:
+        return None, _too_large_response(max_bytes)
+    return uploaded_file, None
+
+
+def blob_path(digest, file_name):
+    # Two levels of fan-out keep every directory at a few thousand entries at most.
+    extension = os.path.splitext(file_name)[1].lower()[:10]
+    return f'blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def store_blob(uploaded_file):
+    """
+    Stores an upload read by ``read_upload`` under its content hash.
+
+    Identical content is written once; further uploads only take another reference.
+
+    :return: The StoredBlob holding the content.
+    """
+    digest = uploaded_file.sha256
+    with transaction.atomic():
+        blob, created = StoredBlob.objects.select_for_update().get_or_create(
+            sha256=digest,
+            defaults={'path': blob_path(digest, uploaded_file.name), 'size': uploaded_file.size},
+        )
+        if not created:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        elif not default_storage.exists(blob.path):
+            # Leaves the row uncommitted if writing the file fails.
+            stored_path = default_storage.save(blob.path, uploaded_file)
+            if stored_path != blob.path:
+                blob.path = stored_path
+                blob.save(update_fields=['path'])
+    return blob
+
+
+def release_blob(path):
+    """
+    Drops one reference to the blob stored at ``path`` (a storage name or a
+    ``MEDIA_URL`` prefixed URL), deleting the file once nothing references it.
+
+    :return: Number of bytes freed, 0 if the blob is still referenced or unknown.
+    """
+    if path and path.startswith(settings.MEDIA_URL):
+        path = path[len(settings.MEDIA_URL):]
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(path=path).first()
+        if blob is None:
+            return 0
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return 0
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(path))
+        return blob.size
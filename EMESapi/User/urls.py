@@ -1,5 +1,6 @@
 from django.urls import include, path
 from .views import *
+from . import async_views
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -19,19 +20,37 @@ urlpatterns = [
 
     path('register/' , register , name='register'),
     path('login/', login , name='login'),
+    path('token/refresh/', refresh_token, name='token_refresh'),
 
     path('users/', get_users, name='get_users'),
     path('users/<int:user_id>/', get_users, name='get_user_details'),
+    path('users/autocomplete/', autocomplete_users, name='autocomplete_users'),
     path('users/<int:user_id>/view-request/', create_view_request, name='create_view_request'),
+    path('search/', search, name='search'),
+    path('user/update/', UserProfileSectionsUpdate.as_view(), name='user_update_sections'),
     path('user/update/<str:action>/', UserRegistrationUpdates.as_view(), name='user_update'),
 
 
     path('admin/users/', fetch_users, name='fetch_users'), 
+    path('admin/users/export/', export_users, name='export_users'),
+    path('admin/users/import/', import_users, name='import_users'),
     path('admin/users/<int:user_id>/', fetch_users, name='fetch_user_by_id'), 
     path('admin/requests/<int:request_id>/approve/', approve_request, name='approve_request'),
     path('admin/requests/<int:request_id>/reject/', reject_request, name='reject_request'),
+    path('admin/moderation/', bulk_moderation, name='bulk_moderation'),
+    path('admin/receipts/', get_pending_receipts, name='get_pending_receipts'),
+    path('admin/receipts/<int:receipt_id>/status/', update_receipt_status, name='update_receipt_status'),
 
     path('admin/user/manage/<str:action>/<int:user_id>/', UserManagementView.as_view(), name='user_management'),
+    path('admin/stats/', get_member_stats, name='member_stats'),
+    path('admin/cache/stats/', get_cache_stats, name='cache_stats'),
+
+    path('async/login/', async_views.login, name='async_login'),
+    path('async/users/', async_views.get_users, name='async_get_users'),
+    path('async/users/<int:user_id>/', async_views.get_users, name='async_get_user_details'),
+    path('async/users/<int:user_id>/view-request/', async_views.create_view_request, name='async_create_view_request'),
+    path('async/admin/users/', async_views.fetch_users, name='async_fetch_users'),
+    path('async/admin/users/<int:user_id>/', async_views.fetch_users, name='async_fetch_user_by_id'),
 
     path('', include(router.urls)),
 
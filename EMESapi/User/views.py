@@ -1,33 +1,85 @@
+import csv
+import json
+from urllib.parse import urlencode
+
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view,permission_classes,action
+from rest_framework.decorators import api_view,authentication_classes,permission_classes,throttle_classes,action
 from utils.emailbody import generate_html_email_body
 from rest_framework.permissions import IsAuthenticated,AllowAny,IsAdminUser
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_logged_in
 from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from utils.permisions import IsOwnerOrAdmin
-from django.core.files.storage import default_storage
+from utils.pagination import DirectoryCursorPagination, ReviewQueueCursorPagination
+from utils.cache import CachedListMixin, cache_stats, memoize_for_request, read_through
+from utils.conditional import ConditionalGetMixin, conditional_get, make_validators, queryset_validators
+from utils.tokens import issue_tokens
+from utils.hashing import HashingUnavailable
+from utils.metrics import timed
+from utils.throttling import SlidingWindowThrottle
 from rest_framework.exceptions import NotFound
 
 from .models import (
     User, Address, Contact, Education, ProfessionalExperience,
     Publications, Projects, Patents, Award, AnnualMembershipFee, ViewRequests,
+    DirectoryEntry, MemberStatCount, PROFILE_SECTIONS,
+)
+from .directory import directory_rows
+from .outbox import enqueue_email
+from .receipts import RECEIPT_STATUSES, receipt_counts, review_queue, review_queue_row
+from .uploads import read_upload, release_blob, store_blob
+from .derivatives import derivative_urls, schedule_derivatives
+from .search import search_users
+from .stats import member_stats
+from .autocomplete import prefix_index
+from .imports import IMPORT_FORMATS, import_members, read_rows
+from .moderation import (
+    MODERATION_OPERATIONS, VIEW_REQUEST_RELATED, issuer_email, moderate, requested_user_info,
 )
 from .serializer import (
     UserSerializer, AddressSerializer, ContactSerializer, EducationSerializer,
     ProfessionalExperienceSerializer, PublicationsSerializer, ProjectsSerializer,
     PatentsSerializer, AwardSerializer, AnualMembershipFeeSerializer,
+    UserProfileBundleSerializer, UserExportSerializer,
 )
 
+# Serializer for each profile section, keyed by the User foreign key it fills
+SECTION_SERIALIZERS = {
+    'address': AddressSerializer,
+    'contact': ContactSerializer,
+    'education': EducationSerializer,
+    'professional_experience': ProfessionalExperienceSerializer,
+    'projects': ProjectsSerializer,
+    'awards': AwardSerializer,
+    'publications': PublicationsSerializer,
+    'patents': PatentsSerializer,
+    'payment': AnualMembershipFeeSerializer,
+}
+
+DIRECTORY_FIELDS = ["id", "username", "full_name", "nationality" , "sex"]
+
+
+def directory_entry(user):
+    """Builds a public directory entry from a ``directory_rows()`` row."""
+    entry = {field: user.get(field) for field in DIRECTORY_FIELDS}
+    entry['profile_picture_variants'] = derivative_urls(user.get('profile_picture'))
+    return entry
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([SlidingWindowThrottle.for_scope('register')])
 def register_admin(request):
     username = request.data.get('username')
     password = request.data.get('password')
@@ -46,12 +98,16 @@ def register_admin(request):
         )
 
     try:
-        user = User.objects.create_user(
-            username=username,
-            password=password,
-            verified=True, 
+        with timed('hashing'):
+            hashed_password = make_password(password)
+        user = User.objects.create(
+            username=User.normalize_username(username),
+            password=hashed_password,
+            verified=True,
             is_staff=True,
         )
+    except HashingUnavailable:
+        raise
     except Exception as e:
         return Response(
             {"message": f"Error creating user: {str(e)}"},
@@ -64,8 +120,9 @@ def register_admin(request):
     )
 
 
-@permission_classes([AllowAny])
 @api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([SlidingWindowThrottle.for_scope('register')])
 def register(request): 
     if request.method == 'POST':
         if not request.data.get('username'):
@@ -81,21 +138,23 @@ def register(request):
             password = serializer.validated_data.get('password')
        
             if password:
-                hashed_password = make_password(password)
+                with timed('hashing'):
+                    hashed_password = make_password(password)
                 serializer.validated_data['password'] = hashed_password
 
             
                 
-            user = serializer.save()
-            user.is_organization = is_organization
-            user.save()
+            user = serializer.save(is_organization=is_organization)
 
-            token = Token.objects.create(user=user)
+            if settings.AUTH_TOKEN_MODE == 'jwt':
+                credentials = issue_tokens(user)
+            else:
+                credentials = {"token": Token.objects.create(user=user).key}
 
         
             return Response(
                 {
-                    "token": token.key,
+                    **credentials,
                     "user": serializer.data,
                     "message": "User created successfwully",
                 },
@@ -113,21 +172,28 @@ def register(request):
     )
     
 
-@permission_classes([AllowAny])
 @api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([SlidingWindowThrottle.for_scope('login')])
 def login(request):
     if request.method == 'POST':
         username = request.data.get('username')
         password = request.data.get('password')
 
-        user = authenticate(request, username=username, password=password)
+        with timed('hashing'):
+            user = authenticate(request, username=username, password=password)
         # print(password , user)
         if user is not None:
-            token,_ = Token.objects.get_or_create(user=user)
+            user_logged_in.send(sender=user.__class__, request=request, user=user)
+            if settings.AUTH_TOKEN_MODE == 'jwt':
+                credentials = issue_tokens(user)
+            else:
+                token,_ = Token.objects.get_or_create(user=user)
+                credentials = {"token" : token.key}
             data = UserSerializer(user).data
             return Response(
                 {
-                    "token" : token.key,
+                    **credentials,
                     "user" : data,
                     "message" : "login successful",
                 },
@@ -140,6 +206,29 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def refresh_token(request):
+    try:
+        refresh = RefreshToken(request.data.get('refresh'))
+    except TokenError:
+        return Response(
+            {"message": "Invalid or expired refresh token."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    # Refreshing re-reads the user so new access tokens always carry current claims.
+    user = User.objects.filter(id=refresh[jwt_settings.USER_ID_CLAIM]).first()
+    if user is None or not user.is_active:
+        return Response(
+            {"message": "User not found or inactive."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    return Response(issue_tokens(user), status=status.HTTP_200_OK)
+
+
 class UserRegistrationUpdates(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class =  UserSerializer
@@ -153,15 +242,8 @@ class UserRegistrationUpdates(APIView):
             )
 
         actions_map = {
-            "add_address": (AddressSerializer, "address"),
-            "add_contact": (ContactSerializer, "contact"),
-            "add_education": (EducationSerializer, "educational_background"),
-            "add_professional_experience": (ProfessionalExperienceSerializer, "professional_experience"),
-            "add_projects": (ProjectsSerializer, "projects"),
-            "add_awards": (AwardSerializer, "awards"),
-            "add_publications": (PublicationsSerializer, "publications"),
-            "add_patents": (PatentsSerializer, "patents"),
-            "add_payment": (AnualMembershipFeeSerializer, "payment"),
+            f"add_{field}": (serializer_class, field)
+            for field, serializer_class in SECTION_SERIALIZERS.items()
         }
 
         if action not in actions_map:
@@ -174,9 +256,11 @@ class UserRegistrationUpdates(APIView):
         serializer = serializer_class(data=request.data)
 
         if serializer.is_valid():
-            saved_instance = serializer.save()
-            setattr(user, user_field, saved_instance) 
-            user.save()
+            # Row and foreign key commit together, so the section GC never sees the row unlinked.
+            with transaction.atomic():
+                saved_instance = serializer.save()
+                setattr(user, user_field, saved_instance) 
+                user.save(update_fields=[user_field])
             return Response(
                 {"message": f"{action.replace('_', ' ').title()} added successfully"},
                 status=status.HTTP_202_ACCEPTED
@@ -188,37 +272,182 @@ class UserRegistrationUpdates(APIView):
         )
 
 
+class UserProfileSectionsUpdate(APIView):
+    """
+    Adds any subset of the profile sections in one request.
+
+    Every section is validated before anything is written; the rows are then
+    created in one transaction and the user's foreign keys set with a single UPDATE.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, dict) or not request.data:
+            return Response(
+                {"message": "Send an object mapping section names to their fields."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        unknown = set(request.data) - set(SECTION_SERIALIZERS)
+        if unknown:
+            return Response(
+                {"message": f"Unknown sections: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializers_by_field = {
+            field: SECTION_SERIALIZERS[field](data=data)
+            for field, data in request.data.items()
+        }
+        errors = {
+            field: serializer.errors
+            for field, serializer in serializers_by_field.items()
+            if not serializer.is_valid()
+        }
+        if errors:
+            return Response(
+                {"message": "Serializer failed", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+        with transaction.atomic():
+            for field, serializer in serializers_by_field.items():
+                setattr(user, field, serializer.save())
+            user.save(update_fields=list(serializers_by_field))
+
+        return Response(
+            {
+                "message": "Profile sections added successfully",
+                "sections": {field: serializer.data for field, serializer in serializers_by_field.items()},
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
 @api_view(['GET'])
 def get_users(request, user_id=None):
-    fields_to_return = ["id", "username", "full_name", "nationality" , "sex"]
+    if user_id:
+        dependencies = [(User, f"id:{user_id}")]
+    else:
+        organization_filter = (request.query_params.get('organization') or '').lower()
+        if organization_filter in ('true', 'false'):
+            dependencies = [(User, f"organization:{organization_filter == 'true'}")]
+        else:
+            dependencies = [(User, "organization:True"), (User, "organization:False")]
+
+    # Validators are memoized under the same versions as the body, so they always describe it.
+    validators = memoize_for_request(
+        "directory:validators", dependencies, request, lambda: _directory_validators(request, user_id)
+    )
+    return conditional_get(
+        request,
+        validators,
+        lambda: read_through("directory", dependencies, request, lambda: _get_users(request, user_id)),
+    )
 
-    organization_filter = request.query_params.get('organization', None)
 
+def _directory_queryset(organization_filter):
+    # Returns None for an unknown filter so callers can answer with a 400.
+    users = DirectoryEntry.objects.all()
+    if organization_filter:
+        if organization_filter.lower() == 'true':
+            users = users.filter(is_organization=True)
+        elif organization_filter.lower() == 'false':
+            users = users.filter(is_organization=False)
+        else:
+            return None
+    return users
+
+
+def _directory_validators(request, user_id=None):
     if user_id:
-        user = get_object_or_404(User, id=user_id)
-        user_data = {field: getattr(user, field, None) for field in fields_to_return}
-        return Response(user_data, status=status.HTTP_200_OK)
+        return make_validators(DirectoryEntry.objects.filter(user_id=user_id).values_list('updated_at', flat=True).first())
+    users = _directory_queryset(request.query_params.get('organization', None))
+    return queryset_validators(users) if users is not None else None
+
+
+def _get_users(request, user_id=None):
+    # Reads only the narrow directory table, which lists verified non-staff members.
+    if user_id:
+        user = directory_rows(DirectoryEntry.objects.filter(user_id=user_id)).first()
+        if user is None:
+            raise NotFound("No User matches the given query.")
+        return Response(directory_entry(user), status=status.HTTP_200_OK)
     else:
-        users = User.objects.filter(verified=True, is_staff=False)
+        users = _directory_queryset(request.query_params.get('organization', None))
+        if users is None:
+            return Response({"detail": "Invalid 'organization' filter. Use 'true' or 'false'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = DirectoryCursorPagination()
+        page = paginator.paginate_queryset(directory_rows(users), request)
+
+        users_data = [directory_entry(user) for user in page]
+
+        return paginator.get_paginated_response(users_data)
+
+
+@api_view(['GET'])
+def autocomplete_users(request):
+    prefix = (request.query_params.get('q') or '').strip()
+    if not prefix:
+        return Response({"detail": "The 'q' parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(1, int(request.query_params.get('limit', 10))), settings.AUTOCOMPLETE_MAX_RESULTS)
+    except ValueError:
+        return Response({"detail": "'limit' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"results": prefix_index.lookup(prefix, limit)}, status=status.HTTP_200_OK)
 
-        if organization_filter:
-            if organization_filter.lower() == 'true':
-                users = users.filter(is_organization=True)
-            elif organization_filter.lower() == 'false':
-                users = users.filter(is_organization=False)
-            else:
-                return Response({"detail": "Invalid 'organization' filter. Use 'true' or 'false'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        users_data = [
-            {field: getattr(user, field, None) for field in fields_to_return}
-            for user in users
-        ]
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    query = (request.query_params.get('q') or '').strip()
+    if not query:
+        return Response({"detail": "The 'q' parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+        page_size = min(max(1, int(request.query_params.get('page_size', settings.SEARCH_PAGE_SIZE))), settings.DIRECTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "'page' and 'page_size' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Ranking is cheap for the first pages only; deep offsets are cut off.
+    offset = (page - 1) * page_size
+    if offset >= settings.SEARCH_MAX_RESULTS:
+        return Response({"detail": "Refine the query to see more results."}, status=status.HTTP_400_BAD_REQUEST)
+
+    hits = search_users(query, limit=page_size + 1, offset=offset)
+    if hits is None:
+        return Response({"detail": "Search is not available on this database."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    has_next = len(hits) > page_size and offset + page_size < settings.SEARCH_MAX_RESULTS
+    hits = hits[:page_size]
+    users = {
+        user['id']: user
+        for user in directory_rows(DirectoryEntry.objects.filter(user_id__in=[user_id for user_id, _ in hits]))
+    }
+
+    def page_url(number):
+        return request.build_absolute_uri(f"{request.path}?{urlencode({'q': query, 'page': number, 'page_size': page_size})}")
 
-        return Response(users_data, status=status.HTTP_200_OK)
+    return Response(
+        {
+            "next": page_url(page + 1) if has_next else None,
+            "previous": page_url(page - 1) if page > 1 else None,
+            "results": [
+                {**directory_entry(users[user_id]), "score": score}
+                for user_id, score in hits if user_id in users
+            ],
+        },
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([SlidingWindowThrottle.for_scope('view_request')])
 def create_view_request(request, user_id):
 
     requesting_user = request.user
@@ -228,23 +457,21 @@ def create_view_request(request, user_id):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    user_to_view = get_object_or_404(User, id=user_id)
+    user_to_view = get_object_or_404(User.objects.only('id', 'username'), id=user_id)
 
-    existing_request = ViewRequests.objects.filter(
-        issuer=requesting_user, requested_user=user_to_view
-    ).exists()
-
-    if existing_request:
+    # The unique (issuer, requested_user) constraint rejects duplicates, including concurrent ones.
+    try:
+        with transaction.atomic():
+            ViewRequests.objects.create(
+                issuer=requesting_user,
+                requested_user=user_to_view
+            )
+    except IntegrityError:
         return Response(
             {"message": "You have already made a request to view this user's full information."},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    _ = ViewRequests.objects.create(
-        issuer=requesting_user,
-        requested_user=user_to_view
-    )
-
     return Response(
         {"message": f"Request to view {user_to_view.username}'s full information has been sent."},
         status=status.HTTP_201_CREATED
@@ -255,69 +482,151 @@ def create_view_request(request, user_id):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def fetch_users(request, user_id=None):
     if user_id:
-        user = get_object_or_404(User, id=user_id)
-        serializer = UserSerializer(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        user = get_object_or_404(User.objects.with_profile(), id=user_id)
+        return conditional_get(
+            request,
+            _profile_validators(user),
+            lambda: Response(UserProfileBundleSerializer(user).data, status=status.HTTP_200_OK),
+        )
     
-    status_filter = request.query_params.get('status', None)
+    users = _filter_users_by_status(request.query_params.get('status', None))
+    if users is None:
+        return Response(
+            {"message": "Invalid status filter. Use 'verified' or 'unverified'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    if status_filter:
-        if status_filter == "verified":
-            users = User.objects.filter(verified=True)
-        elif status_filter == "unverified":
-            users = User.objects.filter(verified=False)
-        else:
-            return Response(
-                {"message": "Invalid status filter. Use 'verified' or 'unverified'."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    else:
-        users = User.objects.all()
+    def compute():
+        serializer = UserSerializer(users, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return conditional_get(request, queryset_validators(users), compute)
 
 
-@api_view(['DELETE'])
+def _profile_validators(user):
+    # A deleted section nulls the user's foreign key without saving the user; the
+    # section turning into None still changes the ETag.
+    sections = [getattr(user, field) for field in PROFILE_SECTIONS]
+    return make_validators(
+        user.updated_at, *(section.updated_at if section else None for section in sections)
+    )
+
+
+def _filter_users_by_status(status_filter):
+    # Returns None for an unknown filter so callers can answer with a 400.
+    if not status_filter:
+        return User.objects.all()
+    if status_filter == "verified":
+        return User.objects.filter(verified=True)
+    if status_filter == "unverified":
+        return User.objects.filter(verified=False)
+    return None
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def _stream_users_ndjson(users):
+    serializer = UserExportSerializer()
+    for user in users:
+        yield json.dumps(serializer.to_representation(user), cls=DjangoJSONEncoder) + "\n"
+
+
+def _stream_users_csv(users):
+    serializer = UserExportSerializer()
+    columns = list(serializer.fields)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for user in users:
+        row = serializer.to_representation(user)
+        yield writer.writerow([
+            json.dumps(row[column], cls=DjangoJSONEncoder) if isinstance(row[column], (list, dict)) else row[column]
+            for column in columns
+        ])
+
+
+@api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
-def approve_request(request, request_id):
+def export_users(request):
+    export_format = request.query_params.get('export_format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return Response(
+            {"message": "Invalid export format. Use 'ndjson' or 'csv'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    view_request = get_object_or_404(ViewRequests, id=request_id)
-    requested_user = view_request.requested_user
-
-    full_info = {
-        'full_name': requested_user.full_name,
-        'sex': requested_user.sex,
-        'date_of_birth': requested_user.date_of_birth,
-        'nationality': requested_user.nationality,
-        'address': requested_user.address,
-        'contact': requested_user.contact,
-        'education': requested_user.educational_background,
-        'professional_experience': requested_user.professional_experience,
-        'projects': requested_user.projects,
-        'awards': requested_user.awards,
-        'publications': requested_user.publications,
-        'patents': requested_user.patents,
-    }
+    users = _filter_users_by_status(request.query_params.get('status', None))
+    if users is None:
+        return Response(
+            {"message": "Invalid status filter. Use 'verified' or 'unverified'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # iterator() reads the table in chunks (server-side cursor where supported).
+    users = users.order_by('id').iterator(chunk_size=settings.USER_EXPORT_CHUNK_SIZE)
+
+    if export_format == 'csv':
+        response = StreamingHttpResponse(_stream_users_csv(users), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="users.csv"'
+    else:
+        response = StreamingHttpResponse(_stream_users_ndjson(users), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="users.ndjson"'
+    return response
 
-    # issuer_email = view_request.issuer.contact.email
-    # admin_email = request.user.contact.email
 
-    # html_body = generate_html_email_body(full_info)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def import_users(request):
+    import_format = request.query_params.get('import_format', 'ndjson').lower()
+    if import_format not in IMPORT_FORMATS:
+        return Response(
+            {"message": "Invalid import format. Use 'ndjson' or 'csv'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
+    import_file, error = read_upload(request, 'file', max_bytes=settings.IMPORT_MAX_BYTES)
+    if error:
+        return error
+    if import_file is None:
+        return Response({"message": "No import file provided."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # send_mail(
-    #     subject="Your Requested User Information",
-    #     message='',
-    #     from_email=admin_email, # some email that works here this does not
-    #     recipient_list=[issuer_email],
-    #     html_message=html_body,
-    # )
+    # Large files belong to `manage.py import_members`; this runs within the request.
+    import_file.seek(0)
+    report = import_members(read_rows(import_file.file, import_format))
+    return Response(report.as_dict(), status=status.HTTP_200_OK)
 
-    view_request.delete()
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def approve_request(request, request_id):
+
+    # One joined query for the request, the requested user's profile sections and the issuer's contact.
+    view_request = get_object_or_404(ViewRequests.objects.select_related(*VIEW_REQUEST_RELATED), id=request_id)
+    full_info = requested_user_info(view_request.requested_user)
+
+    email = issuer_email(view_request.issuer)
+    if not email:
+        # Approval does not depend on the email; there is just nowhere to send it.
+        view_request.delete()
+        return Response(
+            {"message": "Request approved. The requester has no email address on file, so no email was sent."},
+            status=status.HTTP_200_OK
+        )
+
+    # Queued in the same transaction as the delete; the send_outbox worker delivers it.
+    with transaction.atomic():
+        enqueue_email(
+            subject="Your Requested User Information",
+            recipients=[email],
+            html_body=generate_html_email_body(full_info),
+        )
+        view_request.delete()
 
     return Response(
-        {"message": "Request approved and email sent to the requester."},
+        {"message": "Request approved and email queued for the requester."},
         status=status.HTTP_200_OK
     )
 
@@ -335,23 +644,60 @@ def reject_request(request, request_id):
     )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def bulk_moderation(request):
+    operations = request.data
+    if not isinstance(operations, dict) or not operations:
+        return Response(
+            {"message": f"Send an object mapping operations to id lists: {', '.join(MODERATION_OPERATIONS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    unknown = sorted(set(operations) - set(MODERATION_OPERATIONS))
+    if unknown:
+        return Response(
+            {"message": f"Unknown operations: {', '.join(unknown)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    for operation, ids in operations.items():
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            return Response(
+                {"message": f"'{operation}' must be a list of integer ids."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    if sum(len(ids) for ids in operations.values()) > settings.MODERATION_MAX_IDS:
+        return Response(
+            {"message": f"At most {settings.MODERATION_MAX_IDS} ids can be moderated per request."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({"results": moderate(operations)}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_receipt(request):
     if request.method == 'POST':
-        if 'receipt' not in request.FILES:
+        receipt_file, error = read_upload(request, 'receipt')
+        if error:
+            return error
+        if receipt_file is None:
             return Response({'error': 'No receipt file provided'}, status=400)
 
-        receipt_file = request.FILES['receipt']
+        blob = store_blob(receipt_file)
 
-        file_path = default_storage.save(f'receipt/{receipt_file.name}', receipt_file)
+        receipt_url = f'{settings.MEDIA_URL}{blob.path}'
 
-        receipt_url = f'{settings.MEDIA_URL}{file_path}'
-
-        fee = AnnualMembershipFee.objects.create(
-            receipt_url=receipt_url,
-            status='Pending'  
-        )
+        with transaction.atomic():
+            fee = AnnualMembershipFee.objects.create(
+                receipt=receipt_url,
+                status=AnnualMembershipFee.PENDING
+            )
+            request.user.payment = fee
+            request.user.save(update_fields=['payment'])
 
         serializer = AnualMembershipFeeSerializer(fee)
         return Response(serializer.data, status=201)
@@ -362,23 +708,27 @@ def upload_receipt(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_degree(request):
-    if 'degree_file' not in request.FILES:
+    degree_file, error = read_upload(request, 'degree_file')
+    if error:
+        return error
+    if degree_file is None:
         return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
 
-    degree_file = request.FILES['degree_file']
+    blob = store_blob(degree_file)
 
-    file_path = default_storage.save(f'degrees/{degree_file.name}', degree_file)
+    degree_file_url = f'{settings.MEDIA_URL}{blob.path}'
 
-    degree_file_url = f'{settings.MEDIA_URL}{file_path}'
-
-    education = Education.objects.create(
-        highest_degree=request.data.get('highest_degree', ''),
-        field_of_study=request.data.get('field_of_study', ''),
-        university=request.data.get('university', ''),
-        graduation_year=request.data.get('graduation_year', ''),
-        specialization=request.data.get('specialization', ''),
-        degree_file=degree_file_url
-    )
+    with transaction.atomic():
+        education = Education.objects.create(
+            highest_degree=request.data.get('highest_degree', ''),
+            field_of_study=request.data.get('field_of_study', ''),
+            university=request.data.get('university', ''),
+            graduation_year=request.data.get('graduation_year', ''),
+            specialization=request.data.get('specialization', ''),
+            degree_file=degree_file_url
+        )
+        request.user.education = education
+        request.user.save(update_fields=['education'])
 
     serializer = EducationSerializer(education)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -390,18 +740,26 @@ def upload_profile_picture(request):
 
     user = request.user
 
-    if 'profile_picture' in request.FILES:
-        profile_picture_file = request.FILES['profile_picture']
+    profile_picture_file, error = read_upload(request, 'profile_picture')
+    if error:
+        return error
+
+    if profile_picture_file is not None:
+        blob = store_blob(profile_picture_file)
+        profile_picture_url = f'{settings.MEDIA_URL}{blob.path}'
 
-        file_path = default_storage.save(f'profile_pictures/{profile_picture_file.name}', profile_picture_file)
-        profile_picture_url = f'{settings.MEDIA_URL}{file_path}'
+        previous_picture = user.profile_picture.name
+        user.profile_picture = blob.path
+        user.save(update_fields=['profile_picture'])
+        if previous_picture:
+            release_blob(previous_picture)
 
-        user.profile_picture = profile_picture_url
-        user.save()
+        schedule_derivatives(blob.path)
 
         return Response({
             'message': 'Profile picture uploaded successfully',
-            'profile_picture_url': profile_picture_url
+            'profile_picture_url': profile_picture_url,
+            'profile_picture_variants': derivative_urls(blob.path),
         }, status=200)
     
     return Response({'error': 'No profile picture provided'}, status=400)   
@@ -410,29 +768,61 @@ def upload_profile_picture(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def get_pending_receipts(request):
-  
-    pending_fees = AnnualMembershipFee.objects.filter(status='Pending')
-
-    serializer = AnualMembershipFeeSerializer(pending_fees, many=True)
+    receipt_status = request.query_params.get('status', AnnualMembershipFee.PENDING)
+    receipt_status = {choice.lower(): choice for choice in RECEIPT_STATUSES}.get(receipt_status.lower())
+    if receipt_status is None:
+        return Response(
+            {"detail": f"Invalid 'status' filter. Use one of: {', '.join(RECEIPT_STATUSES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    return Response(serializer.data, status=200)
+    paginator = ReviewQueueCursorPagination()
+    page = paginator.paginate_queryset(review_queue(receipt_status), request)
+    return Response({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'counts': receipt_counts(),
+        'results': [review_queue_row(row) for row in page],
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['PATCH'])
 @permission_classes([IsAdminUser])
 def update_receipt_status(request, receipt_id):
+    new_status = request.data.get('status', AnnualMembershipFee.ACCEPTED)
+    if new_status not in RECEIPT_STATUSES:
+        return Response(
+            {"detail": f"Invalid status. Use one of: {', '.join(RECEIPT_STATUSES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     try:
         fee = AnnualMembershipFee.objects.get(id=receipt_id)
     except AnnualMembershipFee.DoesNotExist:
         raise NotFound('Receipt not found')
 
-    fee.status = 'Accepted'
-    fee.save()
+    fee.status = new_status
+    fee.save(update_fields=['status'])
 
     serializer = AnualMembershipFeeSerializer(fee)
     return Response(serializer.data, status=200)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def get_member_stats(request):
+    return read_through(
+        "member_stats", [(MemberStatCount, "all")], request,
+        lambda: Response(member_stats(), status=status.HTTP_200_OK),
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def get_cache_stats(request):
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
 class UserManagementView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     serializer_class = UserSerializer
@@ -447,20 +837,20 @@ class UserManagementView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             user.verified = True
-            user.save()
+            user.save(update_fields=['verified'])
             return Response(
                 {"message": f"User {user.username} has been verified successfully."},
                 status=status.HTTP_200_OK
             )
 
         elif action == "make_admin":
-            if user.is_admin:
+            if user.is_staff:
                 return Response(
                     {"message": "User is already an admin."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             user.is_staff = True
-            user.save()
+            user.save(update_fields=['is_staff'])
             return Response(
                 {"message": f"User {user.username} has been promoted to admin successfully."},
                 status=status.HTTP_200_OK
@@ -471,7 +861,7 @@ class UserManagementView(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -484,7 +874,7 @@ class AddressViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -498,7 +888,7 @@ class ContactViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class EducationViewSet(viewsets.ModelViewSet):
+class EducationViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Education.objects.all()
     serializer_class = EducationSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -512,7 +902,7 @@ class EducationViewSet(viewsets.ModelViewSet):
 
 
 
-class ProfessionalExperienceViewSet(viewsets.ModelViewSet):
+class ProfessionalExperienceViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = ProfessionalExperience.objects.all()
     serializer_class = ProfessionalExperienceSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -528,7 +918,7 @@ class ProfessionalExperienceViewSet(viewsets.ModelViewSet):
         return Response({"error": "Organization parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PublicationsViewSet(viewsets.ModelViewSet):
+class PublicationsViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Publications.objects.all()
     serializer_class = PublicationsSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -544,7 +934,7 @@ class PublicationsViewSet(viewsets.ModelViewSet):
         return Response({"error": "Year parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProjectsViewSet(viewsets.ModelViewSet):
+class ProjectsViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Projects.objects.all()
     serializer_class = ProjectsSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -557,18 +947,18 @@ class ProjectsViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class PatentsViewSet(viewsets.ModelViewSet):
+class PatentsViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Patents.objects.all()
     serializer_class = PatentsSerializer
     permission_classes = [IsOwnerOrAdmin]
 
 
-class AwardViewSet(viewsets.ModelViewSet):
+class AwardViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Award.objects.all()
     serializer_class = AwardSerializer
     permission_classes = [IsOwnerOrAdmin]
     
-class AnualMembershipFeeViewSet(viewsets.ModelViewSet):
+class AnualMembershipFeeViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = AnnualMembershipFee.objects.all()
     serializer_class = AnualMembershipFeeSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -578,9 +968,15 @@ class AnualMembershipFeeViewSet(viewsets.ModelViewSet):
         # Update the status of the membership fee
         fee = self.get_object()
         new_status = request.data.get('status', None)
-        if new_status:
-            fee.status = new_status
-            fee.save()
-            return Response({"message": "Status updated successfully."})
-        return Response({"error": "Status field is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not new_status:
+            return Response({"error": "Status field is required."}, status=status.HTTP_400_BAD_REQUEST)
+        # Every status gets its own receipt total and stats bucket, so only the known ones are accepted.
+        if new_status not in RECEIPT_STATUSES:
+            return Response(
+                {"detail": f"Invalid status. Use one of: {', '.join(RECEIPT_STATUSES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fee.status = new_status
+        fee.save(update_fields=['status'])
+        return Response({"message": "Status updated successfully."})
 
@@ -0,0 +1,100 @@
+"""
+Compares the sync DRF views with their async versions under an ASGI server.
+
+Start the project under an ASGI server first, for example::
+
+    uvicorn EMESapi.asgi:application --port 8000
+
+then run, from the directory containing manage.py::
+
+    python -m benchmarks.async_views --base-url http://127.0.0.1:8000 \
+        --concurrency 256 --duration 15 --admin-token <token key> \
+        --target-ids 1000 200000
+
+Each endpoint is driven once through its sync route and once through its
+``/api/async/`` route, and the results are printed as JSON. Note that the
+sync directory routes are answered from the versioned response cache once
+warm, while the async ones always query the database.
+
+A view request can only be made once per user, so ``view_request`` sends
+every request to a different user from ``--target-ids``, the first half of
+the range for the sync route and the second half for the async one. Give it
+a range larger than either run's request count (400 statuses in the report
+mean it ran out), and start the server with ``THROTTLE_VIEW_REQUEST_IP`` and
+``THROTTLE_VIEW_REQUEST_USERNAME`` set empty so the rate limits stay out of
+the measurement.
+"""
+import argparse
+import json
+
+from .driver import run
+
+
+def _endpoints(user_id):
+    # (name, sync path, async path, method, needs admin credentials); "{target}" is a fresh user per request
+    return [
+        ("directory_list", "/api/users/", "/api/async/users/", "GET", False),
+        ("directory_detail", f"/api/users/{user_id}/", f"/api/async/users/{user_id}/", "GET", False),
+        ("admin_user_detail", f"/api/admin/users/{user_id}/", f"/api/async/admin/users/{user_id}/", "GET", True),
+        ("admin_user_list", "/api/admin/users/?status=verified", "/api/async/admin/users/?status=verified", "GET", True),
+        (
+            "view_request",
+            "/api/users/{target}/view-request/",
+            "/api/async/users/{target}/view-request/",
+            "POST",
+            True,
+        ),
+    ]
+
+
+def _request_factory(method, path, headers, targets):
+    if "{target}" not in path:
+        return lambda _: (method, path, headers, None)
+    return lambda sequence: (method, path.format(target=targets[sequence % len(targets)]), headers, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--user-id", type=int, default=1, help="Existing user used by the detail routes.")
+    parser.add_argument("--admin-token", default=None, help="Opaque token key of a verified staff user.")
+    parser.add_argument(
+        "--target-ids", type=int, nargs=2, default=None, metavar=("FIRST", "LAST"),
+        help="Range of existing user ids that view_request sends its requests to.",
+    )
+    parser.add_argument("--only", nargs="*", default=None, help="Endpoint names to run.")
+    args = parser.parse_args()
+
+    targets = range(args.target_ids[0], args.target_ids[1] + 1) if args.target_ids else range(0)
+    # Each route gets its own half, so the async run does not repeat the sync run's requests.
+    target_halves = {"sync": targets[:len(targets) // 2], "async": targets[len(targets) // 2:]}
+
+    report = {"concurrency": args.concurrency, "duration_s": args.duration, "endpoints": {}}
+    for name, sync_path, async_path, method, needs_admin in _endpoints(args.user_id):
+        if args.only and name not in args.only:
+            continue
+        if needs_admin and not args.admin_token:
+            continue
+        if "{target}" in sync_path and len(targets) < 2:
+            continue
+        headers = {"Authorization": f"Token {args.admin_token}"} if needs_admin else {}
+
+        results = {}
+        for variant, path in (("sync", sync_path), ("async", async_path)):
+            results[variant] = run(
+                args.base_url,
+                _request_factory(method, path, headers, target_halves[variant]),
+                concurrency=args.concurrency,
+                duration=args.duration,
+            )
+        sync_rps = results["sync"]["throughput_rps"]
+        results["speedup"] = round(results["async"]["throughput_rps"] / sync_rps, 2) if sync_rps else None
+        report["endpoints"][name] = results
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
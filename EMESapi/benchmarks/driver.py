@@ -0,0 +1,132 @@
+"""
+Minimal asyncio HTTP/1.1 load driver shared by the benchmarks.
+
+Each simulated client keeps one keep-alive connection open and issues requests
+back to back until the duration elapses, so ``concurrency`` is the number of
+requests in flight against the server at any time.
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    """
+    Reduces raw samples to the JSON-friendly summary printed by the benchmarks.
+
+    Latencies are reported in milliseconds.
+    """
+    latencies = sorted(latencies)
+    completed = len(latencies)
+    return {
+        "requests": completed,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p95_ms": _ms(percentile(latencies, 0.95)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+        "max_ms": _ms(latencies[-1] if latencies else None),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+
+    return status, headers.get("connection", "").lower() == "close"
+
+
+async def _client(host, port, make_request, sequence, deadline, latencies, statuses, errors):
+    connection = None
+    while time.perf_counter() < deadline:
+        method, path, headers, body = make_request(next(sequence))
+        body = body or b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(host, port)
+            reader, writer = connection
+            writer.write(payload)
+            await writer.drain()
+            status, close = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            errors[0] += 1
+            if connection is not None:
+                connection[1].close()
+            connection = None
+            continue
+
+        latencies.append(time.perf_counter() - start)
+        statuses[status] += 1
+        if close:
+            writer.close()
+            connection = None
+
+    if connection is not None:
+        connection[1].close()
+
+
+async def _run(base_url, make_request, concurrency, duration):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    latencies, statuses, errors = [], Counter(), [0]
+    sequence = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, make_request, sequence, deadline, latencies, statuses, errors)
+        for _ in range(concurrency)
+    ))
+    return summarize(latencies, statuses, errors[0], time.perf_counter() - start)
+
+
+def run(base_url, make_request, concurrency=64, duration=10.0):
+    """
+    Drives ``base_url`` for ``duration`` seconds and returns a summary dictionary.
+
+    :param base_url: Server root such as ``http://127.0.0.1:8000`` (plain HTTP only).
+    :param make_request: Callable taking a sequence number, unique across all
+        clients of the run, and returning
+        ``(method, path, headers, body)`` for the next request.
+    :param concurrency: Number of concurrent keep-alive clients.
+    :param duration: Length of the measurement window in seconds.
+    """
+    return asyncio.run(_run(base_url, make_request, concurrency, duration))
@@ -0,0 +1,134 @@
+"""
+Measures the hot filter queries with and without the index/constraint pack.
+
+Point DATABASE_URL at a scratch database that has been migrated, then run from
+the directory containing manage.py::
+
+    python -m benchmarks.indexes --users 1000000
+
+The database is seeded with synthetic members and section rows on the first
+run, which is skipped when enough seeded users already exist. The script
+refuses to touch a database holding users it did not create. It then drops
+the indexes and the view-request constraint declared on the models, times
+every query and captures its plan, re-creates them and measures again. The
+report is printed as JSON and the pack is left in place.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from .seed import seed_database, setup_django
+
+
+def _pack():
+    from User.models import (
+        AnnualMembershipFee, DirectoryEntry, Education, Projects, Publications, User, ViewRequests,
+    )
+
+    models = (User, DirectoryEntry, AnnualMembershipFee, Publications, Projects, Education, ViewRequests)
+    return [(model, index) for model in models for index in model._meta.indexes], [
+        (model, constraint) for model in models for constraint in model._meta.constraints
+    ]
+
+
+def _existing_names(model):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+
+
+def set_pack(enabled):
+    from django.db import connection
+
+    indexes, constraints = _pack()
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            present = index.name in _existing_names(model)
+            if enabled and not present:
+                editor.add_index(model, index)
+            elif not enabled and present:
+                editor.remove_index(model, index)
+        for model, constraint in constraints:
+            present = constraint.name in _existing_names(model)
+            if enabled and not present:
+                editor.add_constraint(model, constraint)
+            elif not enabled and present:
+                editor.remove_constraint(model, constraint)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _queries():
+    from User.directory import directory_rows
+    from User.models import DirectoryEntry, Education, Projects, Publications, User, ViewRequests
+    from User.receipts import review_queue
+
+    # The queries get_users runs against the directory read model
+    directory = directory_rows(DirectoryEntry.objects.all())
+    deep_id = User.objects.latest("id").id * 9 // 10
+    pair = ViewRequests.objects.values_list("issuer_id", "requested_user_id").first() or (0, 0)
+
+    # (name, queryset, evaluate)
+    return [
+        ("directory_first_page", directory.order_by("user_id")[:51], list),
+        ("directory_deep_page", directory.filter(user_id__gt=deep_id).order_by("user_id")[:51], list),
+        ("directory_organizations_page", directory.filter(is_organization=True).order_by("user_id")[:51], list),
+        ("pending_receipts", review_queue().order_by("created_at", "id")[:51], list),
+        ("publications_by_year", Publications.objects.filter(date__year=2010), list),
+        ("active_projects", Projects.objects.filter(end__isnull=True), list),
+        ("highest_degree", Education.objects.order_by("-graduation_year")[:1], list),
+        (
+            "view_request_exists",
+            ViewRequests.objects.filter(issuer_id=pair[0], requested_user_id=pair[1]),
+            lambda queryset: queryset.exists(),
+        ),
+    ]
+
+
+def measure(repeats):
+    results = {}
+    for name, queryset, evaluate in _queries():
+        evaluate(queryset.all())  # warm the page cache
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            evaluate(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(sorted(timings)[int(0.95 * (len(timings) - 1))], 3),
+            "plan": queryset.explain(),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    users = seed_database(args.users, random.Random(args.seed))
+
+    set_pack(False)
+    before = measure(args.repeats)
+    set_pack(True)
+    after = measure(args.repeats)
+
+    report = {"users": users, "queries": {}}
+    for name in before:
+        report["queries"][name] = {
+            "before": before[name],
+            "after": after[name],
+            "speedup": round(before[name]["median_ms"] / after[name]["median_ms"], 1) if after[name]["median_ms"] else None,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compares DRF's stdlib JSONRenderer with FastJSONRenderer on fetch_users payloads.
+
+Point DATABASE_URL at a scratch database that has been migrated, then run from
+the directory containing manage.py::
+
+    python -m benchmarks.renderers --users 5000
+
+Seeded members are created on the first run, as in ``benchmarks.indexes``.
+The admin listing is serialized once with ``UserSerializer``, exactly as
+``fetch_users`` does, and then encoded repeatedly by each renderer. The report
+also gives the gzip-compressed size and compression time of the body, and
+fails if the two renderers' outputs decode to different values.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from .seed import seed_database, setup_django
+
+
+def _time(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return result, {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=5000, help="Users in the listing.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils.text import compress_string
+    from rest_framework.renderers import JSONRenderer
+
+    from User.models import User
+    from User.serializer import UserSerializer
+    from utils.renderers import FastJSONRenderer, orjson
+
+    seed_database(args.users, random.Random(args.seed))
+    users = User.objects.order_by("id").prefetch_related("groups", "user_permissions")[: args.users]
+    data = UserSerializer(users, many=True).data
+
+    stdlib_body, stdlib = _time(lambda: JSONRenderer().render(data), args.repeats)
+    fast_body, fast = _time(lambda: FastJSONRenderer().render(data), args.repeats)
+    if json.loads(stdlib_body) != json.loads(fast_body):
+        sys.exit("The renderers disagree on the payload.")
+    compressed, gzip_timing = _time(lambda: compress_string(fast_body), args.repeats)
+
+    report = {
+        "users": len(data),
+        "orjson": orjson is not None,
+        "body_bytes": len(fast_body),
+        "gzip_bytes": len(compressed),
+        "stdlib": stdlib,
+        "fast": fast,
+        "speedup": round(stdlib["median_ms"] / fast["median_ms"], 2) if fast["median_ms"] else None,
+        "gzip": gzip_timing,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
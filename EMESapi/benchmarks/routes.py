@@ -0,0 +1,321 @@
+"""
+Load benchmark covering every route in User/urls.py, router viewsets included.
+
+Seed a scratch database and start the project against it, for example::
+
+    python manage.py seed_members --users 10000
+    gunicorn EMESapi.wsgi --workers 4 --bind 127.0.0.1:8000
+
+then run, from the directory containing manage.py and with the same
+DATABASE_URL as the server::
+
+    python -m benchmarks.routes --base-url http://127.0.0.1:8000 \
+        --concurrency 64 --duration 10 > report.json
+
+Fixture ids are read from the database, the driver logs in as a seeded member
+and as ``bench_admin`` through the API, and then drives each route for the
+given duration. Routes that create or change data are included unless
+``--read-only`` is passed; the approve/reject routes consume seeded view
+requests and answer 404 once those run out. Pass ``--baseline`` with an
+earlier report to add throughput and latency deltas per route. Routes without
+a scenario are listed under ``uncovered`` in the report. SQLite serialises
+writers, so benchmark against PostgreSQL for meaningful write-route numbers.
+Every client shares one IP, so start the server with the ``THROTTLE_*`` limits
+set to empty strings unless the point is to measure rejections.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .driver import run
+from .seed import DEFAULT_PASSWORD, SEED_PREFIX, setup_django
+
+SEARCH_TERMS = ["engineering", "design", "senior+engineer", "lecturer", "structure", "phd"]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[int], str]
+    role: Optional[str] = None  # None, "member" or "admin"
+    body: Optional[Callable[[int], tuple]] = None  # returns (content type, bytes)
+    writes: bool = False
+
+
+def _json(payload):
+    return "application/json", json.dumps(payload).encode()
+
+
+def _multipart(field, filename, content, content_type, **fields):
+    boundary = "----emes-benchmark-boundary"
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n".encode() + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return f"multipart/form-data; boundary={boundary}", b"".join(parts)
+
+
+def _png():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (600, 600), (40, 90, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _cycle(values, default=0):
+    values = list(values) or [default]
+    return lambda seq: values[seq % len(values)]
+
+
+def _once(values):
+    # Consumable fixtures: each id is used once, then a missing id keeps the route answering 404.
+    values = list(values)
+    return lambda seq: values[seq] if seq < len(values) else 0
+
+
+def _batch(values, seq, size):
+    # The seq-th window of ``size`` ids, wrapping around; ids already moderated just report it.
+    if not values:
+        return []
+    start = seq * size % len(values)
+    return values[start:start + size]
+
+
+def _login(base_url, username, password):
+    request = urllib.request.Request(
+        f"{base_url}/api/login/",
+        data=json.dumps({"username": username, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        data = json.load(response)
+    if "access" in data:
+        return {"Authorization": f"Bearer {data['access']}"}, data.get("refresh")
+    return {"Authorization": f"Token {data['token']}"}, None
+
+
+def _fixtures():
+    from User.models import User, ViewRequests
+    from User.signals import SECTION_MODELS
+
+    members = User.objects.filter(username__startswith=SEED_PREFIX, is_staff=False)
+    member = members.filter(verified=True).values_list("username", flat=True).first()
+    if member is None:
+        sys.exit("No seeded members found; run `manage.py seed_members` first.")
+
+    view_requests = list(ViewRequests.objects.order_by("id").values_list("id", flat=True)[:100000])
+    return {
+        "member": member,
+        "user_ids": list(members.filter(verified=True).values_list("id", flat=True)[:10000]),
+        "unverified_ids": list(members.filter(verified=False).values_list("id", flat=True)[:100000]),
+        "approve_ids": view_requests[::2],
+        "reject_ids": view_requests[1::2],
+        "sections": {
+            model._meta.model_name: list(model.objects.values_list("id", flat=True)[:10000])
+            for model in SECTION_MODELS
+        },
+    }
+
+
+def _scenarios(fixtures, run_id, password):
+    user_id = _cycle(fixtures["user_ids"])
+    unverified_id = _once(fixtures["unverified_ids"])
+    approve_id = _once(fixtures["approve_ids"])
+    reject_id = _once(fixtures["reject_ids"])
+    receipt_id = _cycle(fixtures["sections"].get("annualmembershipfee", ()))
+    picture = _png()
+    address = {"residential": "House 1", "employer": "EEP", "city": "Addis Ababa", "country": "ET"}
+
+    scenarios = [
+        Scenario("register_admin", "POST", lambda seq: "/api/admin/register/", writes=True,
+                 body=lambda seq: _json({"username": f"{SEED_PREFIX}load_admin_{run_id}_{seq}", "password": password})),
+        Scenario("register", "POST", lambda seq: "/api/register/", writes=True,
+                 body=lambda seq: _json({"username": f"{SEED_PREFIX}load_{run_id}_{seq}", "password": password})),
+        Scenario("login", "POST", lambda seq: "/api/login/",
+                 body=lambda seq: _json({"username": fixtures["member"], "password": password})),
+        Scenario("token_refresh", "POST", lambda seq: "/api/token/refresh/",
+                 body=lambda seq: _json({"refresh": fixtures["refresh"]})),
+        Scenario("get_users", "GET", lambda seq: "/api/users/"),
+        Scenario("get_user_details", "GET", lambda seq: f"/api/users/{user_id(seq)}/"),
+        Scenario("autocomplete_users", "GET", lambda seq: f"/api/users/autocomplete/?q=bench_{seq % 100}"),
+        Scenario("search", "GET", lambda seq: f"/api/search/?q={SEARCH_TERMS[seq % len(SEARCH_TERMS)]}",
+                 role="member"),
+        Scenario("create_view_request", "POST", lambda seq: f"/api/users/{user_id(seq)}/view-request/",
+                 role="member", writes=True),
+        Scenario("user_update", "POST", lambda seq: "/api/user/update/add_address/",
+                 role="member", writes=True, body=lambda seq: _json(address)),
+        Scenario("user_update_sections", "POST", lambda seq: "/api/user/update/", role="member", writes=True,
+                 body=lambda seq: _json({"address": address, "contact": {"email": "member@example.com", "phone_number": "+251911000000"}})),
+        Scenario("fetch_users", "GET", lambda seq: "/api/admin/users/?status=verified", role="admin"),
+        Scenario("export_users", "GET", lambda seq: "/api/admin/users/export/", role="admin"),
+        Scenario("import_users", "POST", lambda seq: "/api/admin/users/import/", role="admin", writes=True,
+                 body=lambda seq: _multipart("file", "members.ndjson", "\n".join(
+                     json.dumps({"username": f"{SEED_PREFIX}import_{run_id}_{seq}_{row}", "password": password})
+                     for row in range(10)
+                 ).encode(), "application/x-ndjson")),
+        Scenario("fetch_user_by_id", "GET", lambda seq: f"/api/admin/users/{user_id(seq)}/", role="admin"),
+        Scenario("approve_request", "DELETE", lambda seq: f"/api/admin/requests/{approve_id(seq)}/approve/",
+                 role="admin", writes=True),
+        Scenario("reject_request", "DELETE", lambda seq: f"/api/admin/requests/{reject_id(seq)}/reject/",
+                 role="admin", writes=True),
+        Scenario("bulk_moderation", "POST", lambda seq: "/api/admin/moderation/", role="admin", writes=True,
+                 body=lambda seq: _json({
+                     "verify_users": _batch(fixtures["unverified_ids"][::-1], seq, 100),
+                     "accept_receipts": _batch(fixtures["sections"].get("annualmembershipfee", []), seq, 100),
+                 })),
+        Scenario("get_pending_receipts", "GET", lambda seq: "/api/admin/receipts/?page_size=50", role="admin"),
+        Scenario("update_receipt_status", "PATCH", lambda seq: f"/api/admin/receipts/{receipt_id(seq)}/status/",
+                 role="admin", writes=True, body=lambda seq: _json({"status": ("Accepted", "Rejected")[seq % 2]})),
+        Scenario("user_management", "PATCH", lambda seq: f"/api/admin/user/manage/verify_user/{unverified_id(seq)}/",
+                 role="admin", writes=True),
+        Scenario("member_stats", "GET", lambda seq: "/api/admin/stats/", role="admin"),
+        Scenario("cache_stats", "GET", lambda seq: "/api/admin/cache/stats/", role="admin"),
+        Scenario("async_login", "POST", lambda seq: "/api/async/login/",
+                 body=lambda seq: _json({"username": fixtures["member"], "password": password})),
+        Scenario("async_get_users", "GET", lambda seq: "/api/async/users/"),
+        Scenario("async_get_user_details", "GET", lambda seq: f"/api/async/users/{user_id(seq)}/"),
+        Scenario("async_create_view_request", "POST", lambda seq: f"/api/async/users/{user_id(seq + 1)}/view-request/",
+                 role="member", writes=True),
+        Scenario("async_fetch_users", "GET", lambda seq: "/api/async/admin/users/?status=verified", role="admin"),
+        Scenario("async_fetch_user_by_id", "GET", lambda seq: f"/api/async/admin/users/{user_id(seq)}/", role="admin"),
+        Scenario("api-root", "GET", lambda seq: "/api/", role="admin"),
+        Scenario("upload_receipt", "POST", lambda seq: "/api/upload-receipt/", role="member", writes=True,
+                 body=lambda seq: _multipart("receipt", "receipt.pdf", b"%PDF-1.4 benchmark receipt", "application/pdf")),
+        Scenario("upload_degree", "POST", lambda seq: "/api/upload-degree/", role="member", writes=True,
+                 body=lambda seq: _multipart("degree_file", "degree.pdf", b"%PDF-1.4 benchmark degree", "application/pdf",
+                                             highest_degree="MSc", field_of_study="Civil Engineering")),
+        Scenario("upload_profile_picture", "POST", lambda seq: "/api/upload-profile-picture/", role="member", writes=True,
+                 body=lambda seq: _multipart("profile_picture", "picture.png", picture, "image/png")),
+    ]
+
+    prefixes = {
+        "address": "addresses", "contact": "contacts", "education": "educations",
+        "professionalexperience": "professional_experiences", "publications": "publications",
+        "projects": "projects", "patents": "patents", "award": "awards",
+        "annualmembershipfee": "annual_membership_fees",
+    }
+    for basename, prefix in prefixes.items():
+        section_id = _cycle(fixtures["sections"].get(basename, ()))
+        scenarios += [
+            Scenario(f"{basename}-list", "GET", lambda seq, prefix=prefix: f"/api/{prefix}/", role="admin"),
+            Scenario(f"{basename}-detail", "GET",
+                     lambda seq, prefix=prefix, section_id=section_id: f"/api/{prefix}/{section_id(seq)}/", role="admin"),
+        ]
+
+    fee_id = _cycle(fixtures["sections"].get("annualmembershipfee", ()))
+    scenarios += [
+        Scenario("education-highest-degree", "GET", lambda seq: "/api/educations/highest_degree/", role="admin"),
+        Scenario("professionalexperience-by-organization", "GET",
+                 lambda seq: "/api/professional_experiences/by_organization/?organization=EEP", role="admin"),
+        Scenario("publications-by-year", "GET", lambda seq: "/api/publications/by_year/?year=2010", role="admin"),
+        Scenario("projects-active-projects", "GET", lambda seq: "/api/projects/active_projects/", role="admin"),
+        Scenario("annualmembershipfee-update-status", "POST",
+                 lambda seq: f"/api/annual_membership_fees/{fee_id(seq)}/update_status/", role="admin", writes=True,
+                 body=lambda seq: _json({"status": "Accepted"})),
+    ]
+    return scenarios
+
+
+def _route_names():
+    from django.urls import URLResolver, get_resolver
+
+    names = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif pattern.name:
+                names.add(pattern.name)
+
+    walk(get_resolver("User.urls").url_patterns)
+    return names
+
+
+def _compare(route, baseline):
+    if not baseline or not route.get("throughput_rps"):
+        return None
+    change = {}
+    if baseline.get("throughput_rps"):
+        change["throughput_ratio"] = round(route["throughput_rps"] / baseline["throughput_rps"], 3)
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if route.get(key) is not None and baseline.get(key) is not None:
+            change[f"{key}_delta"] = round(route[key] - baseline[key], 2)
+    return change
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds spent on each route.")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password the members were seeded with.")
+    parser.add_argument("--only", nargs="*", default=None, help="Route names to run.")
+    parser.add_argument("--read-only", action="store_true", help="Skip routes that create or change data.")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against.")
+    args = parser.parse_args()
+
+    setup_django()
+    base_url = args.base_url.rstrip("/")
+    fixtures = _fixtures()
+    member_headers, fixtures["refresh"] = _login(base_url, fixtures["member"], args.password)
+    admin_headers, _ = _login(base_url, f"{SEED_PREFIX}admin", args.password)
+    credentials = {None: {}, "member": member_headers, "admin": admin_headers}
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["routes"]
+
+    scenarios = _scenarios(fixtures, int(time.time()), args.password)
+    report = {
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "routes": {},
+        "skipped": {},
+        "uncovered": sorted(_route_names() - {scenario.name for scenario in scenarios}),
+    }
+    for scenario in scenarios:
+        if args.only and scenario.name not in args.only:
+            continue
+        if args.read_only and scenario.writes:
+            report["skipped"][scenario.name] = "writes data"
+            continue
+        if scenario.name == "token_refresh" and not fixtures["refresh"]:
+            report["skipped"][scenario.name] = "requires AUTH_TOKEN_MODE=jwt"
+            continue
+
+        def make_request(seq, scenario=scenario):
+            headers = dict(credentials[scenario.role])
+            body = None
+            if scenario.body:
+                headers["Content-Type"], body = scenario.body(seq)
+            return scenario.method, scenario.path(seq), headers, body
+
+        print(f"{scenario.method} {scenario.name}", file=sys.stderr)
+        result = run(base_url, make_request, concurrency=args.concurrency, duration=args.duration)
+        change = _compare(result, baseline.get(scenario.name))
+        if change:
+            result["change"] = change
+        report["routes"][scenario.name] = result
+
+    if report["uncovered"]:
+        print(f"Routes without a scenario: {', '.join(report['uncovered'])}", file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
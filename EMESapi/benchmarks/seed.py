@@ -0,0 +1,201 @@
+"""
+Synthetic member generator shared by the ``seed_members`` command and the benchmarks.
+
+Every member gets an address, contact, education, professional experience,
+publication and membership fee row, most get a project, and a tenth of the
+member count is added as view requests between random members. All seeded
+members share one password so the load driver can log in as any of them.
+"""
+import os
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+SEED_PREFIX = "bench_"
+DEFAULT_PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ["Abebe", "Almaz", "Dawit", "Hanna", "Kebede", "Meron", "Samuel", "Selam", "Tesfaye", "Yonas"]
+LAST_NAMES = ["Alemu", "Bekele", "Girma", "Haile", "Mengistu", "Tadesse", "Tesfaye", "Wolde", "Worku", "Zewdu"]
+COUNTRIES = [("ET", "Addis Ababa"), ("KE", "Nairobi"), ("NG", "Lagos"), ("US", "Boston"), ("DE", "Berlin")]
+DEGREES = ["BSc", "MSc", "PhD"]
+FIELDS = ["Civil Engineering", "Electrical Engineering", "Mechanical Engineering", "Chemical Engineering", "Software Engineering"]
+EMPLOYERS = ["Ethio Telecom", "Ethiopian Airlines", "EEP", "Addis Ababa University", "Self-employed"]
+POSITIONS = ["Engineer", "Senior Engineer", "Lead Engineer", "Consultant", "Lecturer"]
+JOURNALS = ["Zede Journal", "IEEE Access", "Journal of EEA", "Energy Reports"]
+
+EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _date(rng, days=9000):
+    return EPOCH + timedelta(days=rng.randrange(days))
+
+
+def _sections(rng, index):
+    from User.models import (
+        Address, AnnualMembershipFee, Contact, Education, ProfessionalExperience, Projects, Publications,
+    )
+
+    country, city = rng.choice(COUNTRIES)
+    started = _date(rng)
+    roll = rng.random()
+    sections = {
+        "address": Address(
+            residential=f"House {rng.randrange(1, 2000)}, Kebele {rng.randrange(1, 30):02d}",
+            employer=rng.choice(EMPLOYERS), city=city, country=country,
+        ),
+        "contact": Contact(
+            email=f"{SEED_PREFIX}{index}@example.com",
+            phone_number=f"+2519{rng.randrange(10000000, 99999999)}",
+        ),
+        "education": Education(
+            highest_degree=rng.choice(DEGREES), field_of_study=rng.choice(FIELDS),
+            university="Addis Ababa University", graduation_year=str(rng.randrange(1970, 2025)),
+            specialization=None, degree_file="",
+        ),
+        "professional_experience": ProfessionalExperience(
+            organization=rng.choice(EMPLOYERS), position=rng.choice(POSITIONS),
+            key_responsibilities="Design, supervision and reporting.",
+            start_time=started, end_time=None if rng.random() < 0.6 else started + timedelta(days=rng.randrange(90, 3000)),
+        ),
+        "publications": Publications(
+            title=f"On the design of structure {index}", journal=rng.choice(JOURNALS), date=_date(rng),
+        ),
+        "payment": AnnualMembershipFee(
+            receipt="/media/receipt/seed.pdf",
+            status="Pending" if roll < 0.05 else "Rejected" if roll < 0.1 else "Accepted",
+        ),
+    }
+    if rng.random() < 0.7:
+        start = _date(rng)
+        sections["projects"] = Projects(
+            title=f"Project {index}", description="Feasibility study and detailed design.",
+            start=start, end=None if rng.random() < 0.1 else start + timedelta(days=rng.randrange(30, 900)),
+        )
+    return sections
+
+
+def seed_members(count, rng=None, start=0, password=DEFAULT_PASSWORD, batch_size=BATCH_SIZE, progress=None):
+    """
+    Bulk-creates ``count`` members named ``bench_<start>`` onwards with their profile sections.
+
+    Relies on ``bulk_create`` returning primary keys (PostgreSQL, SQLite 3.35+).
+
+    :param rng: ``random.Random`` instance; pass a seeded one for reproducible data.
+    :param progress: Optional callable receiving the number of members created so far.
+    :return: Number of members created.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from User.models import PROFILE_SECTIONS, User, ViewRequests
+    from User.directory import sync_directory
+    from User.receipts import adjust_receipt_counts
+    from User.search import index_users
+    from User.stats import adjust_member_stats, member_facets
+    from User.signals import SECTION_MODELS
+    from utils.cache import bump_version
+
+    rng = rng or random.Random()
+    hashed_password = make_password(password)
+    created_ids = []
+
+    for batch in _batched(range(start, start + count), batch_size):
+        sections = [_sections(rng, index) for index in batch]
+        with transaction.atomic():
+            for field in PROFILE_SECTIONS:
+                rows = [member[field] for member in sections if field in member]
+                if rows:
+                    type(rows[0]).objects.bulk_create(rows)
+            # bulk_create sends no signals, so the receipt totals are adjusted here.
+            adjust_receipt_counts(Counter(member["payment"].status for member in sections))
+
+            users = []
+            for index, member in zip(batch, sections):
+                is_organization = rng.random() < 0.1
+                users.append(User(
+                    username=f"{SEED_PREFIX}{index}",
+                    password=hashed_password,
+                    first_name="" if is_organization else rng.choice(FIRST_NAMES),
+                    last_name="" if is_organization else rng.choice(LAST_NAMES),
+                    email=f"{SEED_PREFIX}{index}@example.com",
+                    sex=None if is_organization else rng.choice(["M", "F"]),
+                    date_of_birth=None if is_organization else _date(rng, 15000) - timedelta(days=15000),
+                    nationality=member["address"].country,
+                    verified=rng.random() < 0.8,
+                    is_staff=rng.random() < 0.01,
+                    is_organization=is_organization,
+                    **member,
+                ))
+            created = [user.id for user in User.objects.bulk_create(users)]
+            index_users(created)
+            sync_directory(created)
+            adjust_member_stats(after=member_facets(created).values())
+        created_ids.extend(created)
+        if progress:
+            progress(len(created_ids))
+
+    if len(created_ids) > 1:
+        pairs = {(rng.choice(created_ids), rng.choice(created_ids)) for _ in range(len(created_ids) // 10)}
+        for batch in _batched(ViewRequests(issuer_id=a, requested_user_id=b) for a, b in pairs if a != b):
+            ViewRequests.objects.bulk_create(batch, ignore_conflicts=True)
+
+    # bulk_create sends no signals, so the members are indexed and listed above and the cached lists invalidated here.
+    bump_version(User, "all", "organization:True", "organization:False")
+    for model in SECTION_MODELS:
+        bump_version(model)
+
+    return len(created_ids)
+
+
+def ensure_admin(password=DEFAULT_PASSWORD):
+    """
+    Creates (or resets the password of) the ``bench_admin`` staff account the load driver logs in with.
+    """
+    from User.models import User
+
+    user, _ = User.objects.get_or_create(
+        username=f"{SEED_PREFIX}admin",
+        defaults={"verified": True, "is_staff": True, "email": f"{SEED_PREFIX}admin@example.com"},
+    )
+    user.set_password(password)
+    user.save(update_fields=["password"])
+    return user
+
+
+def setup_django():
+    """Configures Django for a benchmark run from the directory containing manage.py."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "EMESapi.settings")
+    django.setup()
+
+
+def seed_database(users_wanted, rng):
+    """
+    Tops the database up to ``users_wanted`` seeded members, refusing to touch a
+    database that holds users the benchmarks did not create.
+
+    :return: Number of users in the database.
+    """
+    from User.models import User
+
+    if User.objects.exclude(username__startswith=SEED_PREFIX).exists():
+        sys.exit("Refusing to seed: the database contains users not created by this benchmark.")
+
+    existing = User.objects.count()
+    if existing < users_wanted:
+        seed_members(users_wanted - existing, rng, start=existing)
+    return User.objects.count()
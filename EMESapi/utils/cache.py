@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def cache_stats():
+    """
+    Returns the hit, miss and invalidation counters of this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _version_key(model, scope):
+    return f"vcache:version:{model._meta.label_lower}:{scope}"
+
+
+def get_versions(version_keys):
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            # Seed from the clock rather than 1 so an evicted version can never
+            # collide with entries that were cached under its previous value.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def bump_version(model, *scopes):
+    """
+    Invalidates every cached response that depends on ``model`` within the given scopes.
+
+    :param model: Model class whose data changed.
+    :param scopes: Scope names such as ``"all"`` or ``"organization:True"``; defaults to ``"all"``.
+    """
+    scopes = scopes or ("all",)
+    for scope in scopes:
+        key = _version_key(model, scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+    _count("invalidations", len(scopes))
+
+
+def _response_key(namespace, dependencies, request):
+    version_keys = [_version_key(model, scope) for model, scope in dependencies]
+    versions = get_versions(version_keys)
+    digest = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return "vcache:{}:{}:{}".format(
+        namespace, ".".join(str(versions[version_key]) for version_key in version_keys), digest
+    )
+
+
+def memoize_for_request(namespace, dependencies, request, compute):
+    """
+    Returns ``compute()`` cached under the same versions and URL as ``read_through``.
+
+    Meant for small values derived from a cached response's data, such as its
+    validators, which then stay consistent with the cached body.
+    """
+    key = _response_key(namespace, dependencies, request)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout=settings.VERSIONED_CACHE_TIMEOUT)
+    return value
+
+
+def read_through(namespace, dependencies, request, compute):
+    """
+    Serves a GET response from the cache, computing and storing it on a miss.
+
+    :param namespace: Name of the cached endpoint.
+    :param dependencies: List of ``(model, scope)`` pairs whose versions the response depends on.
+    :param request: The incoming request; its full URL identifies the filter and page.
+    :param compute: Callable returning the Response; only 200 responses are cached.
+    :return: A Response.
+    """
+    key = _response_key(namespace, dependencies, request)
+    data = cache.get(key)
+    if data is not None:
+        _count("hits")
+        return Response(data, status=status.HTTP_200_OK)
+
+    _count("misses")
+    response = compute()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, timeout=settings.VERSIONED_CACHE_TIMEOUT)
+    return response
+
+
+class CachedListMixin:
+    """
+    Viewset mixin serving ``list()`` through the versioned cache of the viewset's model.
+    """
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+
+        def compute():
+            response = super(CachedListMixin, self).list(request, *args, **kwargs)
+            # Store a plain list; ReturnList keeps a reference to its serializer.
+            response.data = list(response.data)
+            return response
+
+        return read_through(f"list:{model._meta.label_lower}", [(model, "all")], request, compute)
@@ -0,0 +1,93 @@
+"""
+Conditional GET: ``ETag`` and ``Last-Modified`` validators derived from
+``updated_at`` columns, checked before the view serializes anything, so a
+client whose copy is still current gets an empty ``304 Not Modified``.
+
+Listings are validated by ``ETag`` alone. A deletion leaves the newest
+``updated_at`` unchanged, and ``Last-Modified`` only has whole seconds, so an
+``If-Modified-Since`` check would answer 304 for a listing that changed.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.cache import memoize_for_request
+
+
+def make_validators(*timestamps, extra=()):
+    """
+    Returns ``(etag, last_modified)`` for a response built from rows last updated at ``timestamps``.
+
+    :param timestamps: ``updated_at`` values; None for rows that do not exist.
+    :param extra: Further values that change the response, such as a row count.
+    """
+    digest = hashlib.sha1(repr((timestamps, extra)).encode()).hexdigest()
+    known = [timestamp for timestamp in timestamps if timestamp is not None]
+    return quote_etag(digest), max(known) if known else None
+
+
+def queryset_validators(queryset):
+    """
+    Validators for a listing: an ``ETag`` over its newest ``updated_at`` and its
+    row count, which catches deletions, and no ``Last-Modified``.
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    etag, _ = make_validators(stats['last_modified'], extra=(stats['count'],))
+    return etag, None
+
+
+def conditional_get(request, validators, compute):
+    """
+    Answers a GET with 304 if the client's validators match, otherwise with ``compute()``.
+
+    :param validators: ``(etag, last_modified)`` pair, or None to always compute.
+    :param compute: Callable returning the Response; validators are only attached to 200 responses.
+    :return: A Response.
+    """
+    if validators is None:
+        return compute()
+
+    etag, last_modified = validators
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = compute()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    elif response.status_code != status.HTTP_304_NOT_MODIFIED:
+        return response
+
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin adding validators to ``list()`` and ``retrieve()``. List
+    validators are memoized under the versions the list cache uses.
+    """
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = memoize_for_request(
+            f"validators:{queryset.model._meta.label_lower}",
+            [(queryset.model, "all")],
+            request,
+            lambda: queryset_validators(queryset),
+        )
+        return conditional_get(
+            request, validators, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_get(
+            request,
+            make_validators(instance.updated_at),
+            lambda: Response(self.get_serializer(instance).data),
+        )
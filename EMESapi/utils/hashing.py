@@ -0,0 +1,210 @@
+"""
+Password hashing off the request thread.
+
+Requests hash through ``PooledPBKDF2PasswordHasher``, which runs PBKDF2 in a
+dedicated process pool of ``PASSWORD_HASH_CONCURRENCY`` workers. Admission is
+bounded: once every worker is busy and ``PASSWORD_HASH_QUEUE_MAX`` hashes are
+waiting, further requests fail at once with ``HashingUnavailable`` (a 503)
+instead of piling up on the web workers. Async views await the same pool
+through ``amake_password`` and ``acheck_password``.
+
+Bulk imports hash through ``hash_passwords``, bypassing the pooled hasher, on
+a pool of their own, so a large import never queues ahead of logins nor is
+turned away by their admission limit. Both pools and the admission count are
+per web process.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX, PBKDF2PasswordHasher, get_hasher, make_password, verify_password,
+)
+from rest_framework.exceptions import APIException
+
+from utils.metrics import Counter, Gauge, Histogram
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_request_executor = None
+_pending = 0  # Hashes admitted to the request pool and not finished yet
+_admission_lock = threading.Lock()
+
+# Set in pool workers, which hash inline rather than through another pool
+_in_worker = False
+
+
+class HashingUnavailable(APIException):
+    status_code = 503
+    default_detail = "The server is busy. Please try again shortly."
+    default_code = 'hashing_unavailable'
+    wait = 1  # Sent as Retry-After by DRF's exception handler
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones already have it set up.
+    global _in_worker
+    import django
+    from django.apps import apps
+
+    _in_worker = True
+    if not apps.ready:
+        django.setup()
+
+
+def _workers():
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _concurrency():
+    return settings.PASSWORD_HASH_CONCURRENCY or os.cpu_count() or 1
+
+
+def _queue_depth():
+    return max(0, _pending - _concurrency())
+
+
+HASH_QUEUE_DEPTH = Gauge(
+    'emes_password_hash_queue_depth', 'Password hashes waiting for a free hashing worker.', _queue_depth,
+)
+HASH_IN_FLIGHT = Gauge(
+    'emes_password_hash_in_flight', 'Password hashes running or waiting in the hashing pool.', lambda: _pending,
+)
+HASH_WAIT_SECONDS = Histogram(
+    'emes_password_hash_wait_seconds', 'Time password hashes waited for a hashing worker.',
+)
+HASH_REJECTED = Counter(
+    'emes_password_hash_rejected_total', 'Requests turned away because the hashing queue was full.',
+)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_workers(), initializer=_init_worker)
+        return _executor
+
+
+def _get_request_executor():
+    global _request_executor
+    with _executor_lock:
+        if _request_executor is None:
+            _request_executor = ProcessPoolExecutor(max_workers=_concurrency(), initializer=_init_worker)
+        return _request_executor
+
+
+def _release(future):
+    global _pending, _request_executor
+    with _admission_lock:
+        _pending -= 1
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        # A worker died; the next hash starts a fresh pool.
+        with _executor_lock:
+            _request_executor = None
+
+
+def _timed_call(submitted_at, function, args):
+    return time.time() - submitted_at, function(*args)
+
+
+def _submit(function, *args):
+    global _pending
+    with _admission_lock:
+        if _pending >= _concurrency() + settings.PASSWORD_HASH_QUEUE_MAX:
+            HASH_REJECTED.inc()
+            raise HashingUnavailable()
+        _pending += 1
+    try:
+        future = _get_request_executor().submit(_timed_call, time.time(), function, args)
+    except BaseException:
+        with _admission_lock:
+            _pending -= 1
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def _result(outcome):
+    waited, result = outcome
+    HASH_WAIT_SECONDS.observe(max(0.0, waited))
+    return result
+
+
+def run_hashing(function, *args):
+    """
+    Runs ``function(*args)`` in the request hashing pool and waits for it.
+
+    :raises HashingUnavailable: If the pool's queue is full.
+    """
+    return _result(_submit(function, *args).result())
+
+
+async def arun_hashing(function, *args):
+    """Awaitable ``run_hashing``; the event loop is free while the hash runs."""
+    return _result(await asyncio.wrap_future(_submit(function, *args)))
+
+
+async def amake_password(password):
+    """``make_password`` through the hashing pool."""
+    return await arun_hashing(make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """
+    ``verify_password`` through the hashing pool. An unusable or missing
+    ``encoded`` still costs one hash, so unknown usernames take as long.
+
+    :return: ``(is_correct, must_update)``.
+    """
+    return await arun_hashing(verify_password, password, encoded or UNUSABLE_PASSWORD_PREFIX)
+
+
+def _pbkdf2(password, salt, iterations):
+    return PBKDF2PasswordHasher().encode(password, salt, iterations)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    ``PBKDF2PasswordHasher`` that computes digests in the request hashing pool.
+    Encoded passwords are plain ``pbkdf2_sha256`` and interchangeable with Django's.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        if _in_worker:
+            return super().encode(password, salt, iterations)
+        return run_hashing(_pbkdf2, password, salt, iterations)
+
+
+def _import_password(password):
+    hasher = get_hasher()
+    if isinstance(hasher, PooledPBKDF2PasswordHasher):
+        # The same encoding without the request pool, so imports never count against its admission.
+        hasher = PBKDF2PasswordHasher()
+    return make_password(password, hasher=hasher)
+
+
+def hash_passwords(passwords):
+    """
+    Hashes many passwords in parallel across a process pool, in input order.
+
+    ``None`` entries produce unusable passwords, as with ``make_password``.
+
+    :param passwords: Iterable of raw passwords.
+    :return: List of encoded password hashes.
+    """
+    passwords = list(passwords)
+    workers = _workers()
+    if workers <= 1 or len(passwords) < 2:
+        return [_import_password(password) for password in passwords]
+
+    # A few chunks per worker keeps every process busy without paying IPC per password.
+    chunk_size = max(1, math.ceil(len(passwords) / (workers * 4)))
+    return list(_get_executor().map(_import_password, passwords, chunksize=chunk_size))
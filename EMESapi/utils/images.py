@@ -0,0 +1,31 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+def render_square_variants(data, sizes, image_format='WEBP', quality=80):
+    """
+    Renders centre-cropped square copies of an image.
+
+    Kept free of Django imports so it can run inside a worker process.
+
+    :param data: Bytes of the original image.
+    :param sizes: Edge lengths in pixels.
+    :return: Dictionary mapping each size to the encoded variant bytes.
+    """
+    image = Image.open(BytesIO(data))
+    largest = max(sizes)
+    # Lets the JPEG decoder downscale while decoding instead of inflating the full frame.
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    source = image
+    # Render from largest to smallest so each step resamples an already reduced image.
+    for size in sorted(sizes, reverse=True):
+        source = ImageOps.fit(source, (size, size), method=Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        source.save(buffer, format=image_format, quality=quality, method=4)
+        variants[size] = buffer.getvalue()
+    return variants
@@ -0,0 +1,130 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.crypto import constant_time_compare
+
+from utils.cache import cache_stats
+from utils.metrics import (
+    Counter, FunctionCounter, Histogram, install_query_instrumentation,
+    render_metrics, start_request_timings, stop_request_timings,
+)
+
+
+REQUEST_DURATION = Histogram(
+    'emes_request_duration_seconds', 'Time spent handling a request.', ('route', 'method'),
+)
+DB_DURATION = Histogram(
+    'emes_request_db_duration_seconds', 'Time spent executing SQL per request.', ('route',),
+)
+DB_QUERIES = Histogram(
+    'emes_request_db_queries', 'SQL queries executed per request.', ('route',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+SERIALIZER_DURATION = Histogram(
+    'emes_request_serializer_duration_seconds', 'Time spent serializing per request.', ('route',),
+)
+HASHING_DURATION = Histogram(
+    'emes_request_password_hashing_duration_seconds', 'Time spent hashing passwords per request.', ('route',),
+)
+RESPONSES = Counter(
+    'emes_responses_total', 'Responses sent, by route and status code.', ('route', 'method', 'status'),
+)
+FunctionCounter('emes_cache_hits_total', 'Versioned cache hits.', lambda: cache_stats()['hits'])
+FunctionCounter('emes_cache_misses_total', 'Versioned cache misses.', lambda: cache_stats()['misses'])
+FunctionCounter('emes_cache_invalidations_total', 'Versioned cache version bumps.', lambda: cache_stats()['invalidations'])
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request and its SQL, serializer and password hashing work.
+
+    The breakdown is sent back in a ``Server-Timing`` header and aggregated into
+    per-route histograms served by ``metrics_view``. Routes are labelled by their
+    URL pattern, so label cardinality stays bounded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_instrumentation()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = start_request_timings()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        self.record(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = start_request_timings()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        self.record(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, timings, total):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+
+        REQUEST_DURATION.observe(total, route=route, method=request.method)
+        RESPONSES.inc(route=route, method=request.method, status=response.status_code)
+        DB_QUERIES.observe(timings.db_queries, route=route)
+        if timings.db_queries:
+            DB_DURATION.observe(timings.db, route=route)
+        if timings.serializer:
+            SERIALIZER_DURATION.observe(timings.serializer, route=route)
+        if timings.hashing:
+            HASHING_DURATION.observe(timings.hashing, route=route)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={timings.db * 1000:.2f};desc="{timings.db_queries} queries"',
+                f'ser;dur={timings.serializer * 1000:.2f}',
+                f'hash;dur={timings.hashing * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    gzip for clients that accept it, skipping bodies under ``COMPRESSION_MIN_BYTES``,
+    for which the header and CPU cost outweigh the bytes saved.
+    """
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
+
+
+def metrics_view(request):
+    """
+    Serves this process's metrics in the Prometheus text format.
+
+    Scrapers must send ``METRICS_TOKEN`` as a Bearer token or connect from one
+    of ``METRICS_ALLOWED_IPS``; with neither configured the endpoint is only
+    open when ``DEBUG`` is on.
+    """
+    header = request.headers.get('Authorization', '')
+    authorized = (
+        (settings.METRICS_TOKEN and constant_time_compare(header, f'Bearer {settings.METRICS_TOKEN}'))
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        or (settings.DEBUG and not settings.METRICS_TOKEN and not settings.METRICS_ALLOWED_IPS)
+    )
+    if not authorized:
+        return HttpResponse(status=401 if settings.METRICS_TOKEN else 403)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
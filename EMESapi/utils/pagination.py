@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class DirectoryCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key for the public user directory.
+
+    The cursor is opaque to clients and only encodes the last seen id, so every
+    page is an indexed ``id > cursor`` range scan regardless of its depth.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'DIRECTORY_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'DIRECTORY_MAX_PAGE_SIZE', 200)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of ``paginate_queryset()`` for async views, which runs it,
+        page query included, in the sync thread. ``request`` must be a DRF ``Request``.
+        """
+        return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+
+class ReviewQueueCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the receipt review queue, oldest receipt first.
+
+    Pages are ``created_at > cursor`` range scans within one status on the
+    ``(status, created_at, id)`` index; the id only breaks ties.
+    """
+    ordering = ('created_at', 'id')
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'REVIEW_QUEUE_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'REVIEW_QUEUE_MAX_PAGE_SIZE', 200)
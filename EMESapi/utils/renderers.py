@@ -0,0 +1,45 @@
+"""
+JSON renderer that encodes with orjson when it is installed.
+
+orjson encodes the dicts, lists and strings our serializers produce several
+times faster than the stdlib encoder. Output matches DRF's ``JSONRenderer``
+with the default settings (compact, UTF-8, datetimes in ISO 8601 with ``Z``
+for UTC), and values orjson has no native encoding for go through the same
+encoder DRF uses. Anything orjson refuses, such as an integer wider than 64
+bits inside a JSONField, and requests for indented output are rendered by
+DRF's stdlib path instead.
+"""
+from django.db.models.fields.files import FieldFile
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    def default(self, obj):
+        # ImageField/FileField values that reach a response unserialized; DRF's
+        # encoder would otherwise iterate them, reading the file.
+        if isinstance(obj, FieldFile):
+            return obj.url if obj else None
+        return super().default(obj)
+
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, so the output is also valid JavaScript.
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
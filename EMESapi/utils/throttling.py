@@ -0,0 +1,167 @@
+"""
+Sliding-window rate limits kept in the shared cache.
+
+Every limit counts requests in fixed windows. The count over the sliding
+window is estimated as the current window's counter plus the previous one,
+weighted by the share of it the sliding window still overlaps. A check
+increments the current counters first, so concurrent requests each see a
+distinct count, and takes the increment back if the request is rejected.
+Rejected requests are turned away before any hashing or queries.
+
+The configured rates are parsed once, when the app is loaded (see
+``validate_rates``), so a malformed rate stops startup instead of failing
+every throttled request.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import BaseThrottle
+
+from utils.metrics import Counter
+
+
+THROTTLED = Counter(
+    'emes_throttled_total', 'Requests rejected by rate limits.', ('scope', 'key'),
+)
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Parses ``"<requests>/<second|minute|hour|day>"``.
+
+    :return: ``(requests, window seconds)``, or None for an empty rate.
+    :raises ImproperlyConfigured: If the rate is malformed or does not allow at least one request.
+    """
+    if not rate:
+        return None
+    try:
+        requests, period = rate.split('/')
+        requests, window = int(requests), _PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f"Throttle rate {rate!r} is not of the form '<requests>/<second|minute|hour|day>'.")
+    if requests < 1:
+        # Leave the rate empty to disable a limit; blocking every request is not a rate.
+        raise ImproperlyConfigured(f"Throttle rate {rate!r} must allow at least one request.")
+    return requests, window
+
+
+_rates = None
+
+
+def validate_rates():
+    """
+    Parses every rate in ``THROTTLE_RATES``.
+
+    :return: ``{scope: [(key kind, requests, window seconds), ...]}``, without the disabled limits.
+    :raises ImproperlyConfigured: On the first malformed rate.
+    """
+    global _rates
+    if _rates is None:
+        _rates = {
+            scope: [(kind, *parsed) for kind, rate in rates.items() if (parsed := parse_rate(rate))]
+            for scope, rates in settings.THROTTLE_RATES.items()
+        }
+    return _rates
+
+
+@receiver(setting_changed)
+def _reset_rates(setting, **kwargs):
+    global _rates
+    if setting == 'THROTTLE_RATES':
+        _rates = None
+
+
+def _counter_key(scope, kind, ident, window_number):
+    digest = hashlib.sha1(str(ident).encode()).hexdigest()
+    return f"throttle:{scope}:{kind}:{digest}:{window_number}"
+
+
+def _wait(limit, window, elapsed, previous, current):
+    # Seconds until the estimate drops below the limit again, or 0 if it already is.
+    if previous * (window - elapsed) / window + current < limit:
+        return 0
+    if current >= limit:
+        # Wait for this window to end, then for enough of it to slide out.
+        return window - elapsed + window * (1 - limit / current)
+    return window - elapsed - (limit - current) * window / previous
+
+
+def check_rates(scope, idents):
+    """
+    Checks the limits configured for ``scope`` in ``THROTTLE_RATES`` and counts the request if admitted.
+
+    :param idents: ``{key kind: identifier}``, e.g. ``{"ip": ..., "username": ...}``;
+        kinds that are missing or None are not limited.
+    :return: Seconds until the request would be admitted, or None if it was admitted.
+    """
+    now = time.time()
+    limits = []
+    for kind, limit, window in validate_rates().get(scope, ()):
+        if idents.get(kind) is None:
+            continue
+        number = int(now // window)
+        limits.append((
+            kind, limit, window, now - number * window,
+            _counter_key(scope, kind, idents[kind], number - 1),
+            _counter_key(scope, kind, idents[kind], number),
+        ))
+    if not limits:
+        return None
+
+    counts = {}
+    for _, _, window, _, _, current in limits:
+        # add() only creates a missing counter; incr() is atomic in the cache.
+        cache.add(current, 0, timeout=window * 2)
+        counts[current] = cache.incr(current) - 1
+    counts.update(cache.get_many([previous for _, _, _, _, previous, _ in limits]))
+    waits = [
+        (_wait(limit, window, elapsed, counts.get(previous, 0), counts[current]), kind)
+        for kind, limit, window, elapsed, previous, current in limits
+    ]
+    wait, kind = max(waits)
+    if wait > 0:
+        # A rejected request does not count towards any limit.
+        for _, _, _, _, _, current in limits:
+            cache.decr(current)
+        THROTTLED.inc(scope=scope, key=kind)
+        return math.ceil(wait)
+    return None
+
+
+def request_idents(request, username=None):
+    """The client IP (honouring DRF's ``NUM_PROXIES``) and the given username, casefolded."""
+    return {
+        'ip': BaseThrottle().get_ident(request),
+        'username': username.casefold() if isinstance(username, str) and username else None,
+    }
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    DRF throttle applying ``THROTTLE_RATES[scope]``. The username is the
+    authenticated user's, or the ``username`` field of the request body.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        if request.user and request.user.is_authenticated:
+            username = request.user.username
+        else:
+            username = request.data.get('username') if hasattr(request.data, 'get') else None
+        self._wait = check_rates(self.scope, request_idents(request, username))
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+    @classmethod
+    def for_scope(cls, scope):
+        return type(f'{scope.title().replace("_", "")}Throttle', (cls,), {'scope': scope})
@@ -0,0 +1,125 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+# User attributes embedded in access tokens so authentication needs no database lookup
+TOKEN_CLAIMS = ('username', 'is_active', 'is_staff', 'is_superuser', 'verified', 'is_organization')
+
+# Sub-second issue time; ``iat`` only has whole seconds, which cannot order a token
+# against a revocation recorded in the same second.
+ISSUED_AT_CLAIM = 'issued_at'
+
+
+def _revocation_key(user_id):
+    return f"jwt:revoked:{user_id}"
+
+
+def issue_tokens(user):
+    """
+    Issues a stateless refresh/access token pair carrying the user's claims.
+
+    :param user: User instance freshly loaded from the database.
+    :return: Dictionary with the ``refresh`` and ``access`` token strings.
+    """
+    refresh = RefreshToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    refresh[ISSUED_AT_CLAIM] = time.time()
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+    }
+
+
+def revoke_user_tokens(user_id):
+    """
+    Rejects every access token issued to ``user_id`` up to now.
+
+    The denylist holds one timestamp per user and only needs to outlive the
+    access tokens it covers; refreshing re-reads the user from the database.
+    """
+    cache.set(
+        _revocation_key(user_id),
+        time.time(),
+        timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+    )
+
+
+def is_revoked(user_id, issued_at):
+    """
+    :param issued_at: The token's ``ISSUED_AT_CLAIM``, or its whole-second ``iat`` for
+        tokens without one, which are then revoked throughout the second of the revocation.
+    """
+    revoked_at = cache.get(_revocation_key(user_id))
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates Bearer access tokens from their claims alone.
+
+    The returned user is built from the token with every other column deferred,
+    so reading an unclaimed attribute loads it lazily and ``save()`` only writes
+    the columns the view actually set.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            raise InvalidToken("Token is missing user claims")
+
+        if is_revoked(user_id, validated_token.get(ISSUED_AT_CLAIM, validated_token.get('iat', 0))):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        user_model = get_user_model()
+        values = {'id': user_id, **{claim: validated_token[claim] for claim in TOKEN_CLAIMS}}
+        # from_db() expects the loaded values in the model's field order.
+        field_names = [field.attname for field in user_model._meta.concrete_fields if field.attname in values]
+        return user_model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+async def aauthenticate(request):
+    """
+    Authenticates a plain Django async view with the same credentials DRF accepts.
+
+    Bearer tokens are checked from their claims alone; opaque keys are looked up
+    with the async ORM.
+
+    :return: The authenticated user, or None for anonymous requests.
+    :raises AuthenticationFailed: If credentials are present but invalid.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if not header:
+        return None
+
+    if header[0] in api_settings.AUTH_HEADER_TYPES:
+        result = StatelessJWTAuthentication().authenticate(request)
+        return result[0] if result else None
+
+    if header[0] == 'Token':
+        if len(header) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+        try:
+            token = await Token.objects.select_related('user').aget(key=header[1])
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not token.user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return token.user
+
+    return None